@@ -58,6 +58,35 @@ def load_recommender(data_path='data/movies.csv'):
     return MovieRecommender(data_path, rebuild_features=False)
 
 
+# The recommender argument is underscore-prefixed so Streamlit does not try
+# to hash it; data_path keys the cache to the loaded dataset instead.
+@st.cache_data(show_spinner=False)
+def _cached_genres(_recommender, data_path):
+    """Cache the sorted list of available genres."""
+    return _recommender.get_available_genres()
+
+
+@st.cache_data(show_spinner=False)
+def _cached_languages(_recommender, data_path):
+    """Cache the sorted list of available languages."""
+    return _recommender.get_available_languages()
+
+
+@st.cache_data(show_spinner=False, ttl=60)
+def _cached_title_search(_recommender, data_path, query):
+    """Cache title matches for a search query."""
+    matches = _recommender.search_titles(query, top_n=MAX_SEARCH_RESULTS)
+    if not matches:
+        best_match = _recommender.find_movie_by_title(query, fuzzy=True)
+        matches = [best_match.title] if best_match else []
+    return matches
+
+
+# Limits on how many titles are sent to the browser per selectbox
+MAX_SEARCH_RESULTS = 50
+MAX_DROPDOWN_TITLES = 500
+
+
 def display_movie_card(movie_data, rank):
     """Display a movie as a card."""
     st.markdown(f"""
@@ -90,8 +119,8 @@ def main():
         st.error("❌ Movie data not found! Please run: `python -c 'from ingestion.loader import create_sample_dataset; create_sample_dataset()'`")
         return
 
-    # Get all movie titles for search
-    movie_titles = [m.title for m in recommender.get_all_movies()]
+    # All movie titles for search (built once when the recommender loads)
+    movie_titles = recommender.titles
 
     # Main content area - Movie search
     st.markdown("---")
@@ -100,99 +129,118 @@ def main():
     search_method = st.radio(
         "Search Method:",
         ["Dropdown Selection", "Type to Search"],
+        index=1,
         horizontal=True,
         label_visibility="collapsed"
     )
 
-    col1, col2 = st.columns([3, 1])
-
-    with col1:
-        if search_method == "Type to Search":
-            # Text input search
+    # Text input search; the form only submits on Enter or the
+    # Search button, so title matching runs once per query
+    search_input = None
+    if search_method == "Type to Search":
+        with st.form("title_search"):
             search_input = st.text_input(
                 "🔍 Type movie name:",
                 placeholder="e.g., The Matrix, Inception, Interstellar...",
-                help="Start typing to search for a movie"
+                help="Type a movie name and press Enter to search"
             )
-
-            # Find matching movie
-            if search_input:
-                selected_movie = recommender.find_movie_by_title(search_input, fuzzy=True)
-                if selected_movie:
-                    st.success(f"✓ Found: **{selected_movie.title}**")
-                    selected_movie = selected_movie.title
-                else:
-                    st.warning(f"❌ Movie '{search_input}' not found. Try a different name.")
-                    selected_movie = None
+            st.form_submit_button("Search")
+
+    # Lives outside the recommendation form so toggling it shows the
+    # preference widgets straight away
+    use_preferences = st.checkbox("⚙️ Enable personalized preferences", key="use_prefs")
+
+    # Movie choice, result count and preferences are submitted together,
+    # so the recommendation pipeline runs once per submit
+    with st.form("reco_form"):
+        col1, col2 = st.columns([3, 1])
+
+        with col1:
+            selected_movie = None
+            if search_method == "Type to Search":
+                # Find matching movies (only the top matches reach the browser)
+                if search_input:
+                    matches = _cached_title_search(recommender, recommender.data_path, search_input)
+
+                    if matches:
+                        selected_movie = st.selectbox(
+                            f"✓ Found {len(matches)} match(es):",
+                            options=matches,
+                            index=0
+                        )
+                    else:
+                        st.warning(f"❌ Movie '{search_input}' not found. Try a different name.")
             else:
-                selected_movie = None
-        else:
-            # Dropdown selection
-            selected_movie = st.selectbox(
-                "🔍 Select a movie:",
-                options=movie_titles,
-                index=0,
-                help="Choose from available movies"
+                # Dropdown selection
+                selected_movie = st.selectbox(
+                    "🔍 Select a movie:",
+                    options=movie_titles[:MAX_DROPDOWN_TITLES],
+                    index=0,
+                    help="Choose from available movies"
+                )
+                if len(movie_titles) > MAX_DROPDOWN_TITLES:
+                    st.caption(
+                        f"Showing the first {MAX_DROPDOWN_TITLES} of {len(movie_titles)} movies. "
+                        "Use \"Type to Search\" to find any title."
+                    )
+
+        with col2:
+            # Number of recommendations
+            top_k = st.number_input(
+                "# Results:",
+                min_value=1,
+                max_value=20,
+                value=5,
+                step=1,
+                help="Number of recommendations to show"
             )
 
-    with col2:
-        # Number of recommendations
-        top_k = st.number_input(
-            "# Results:",
-            min_value=1,
-            max_value=20,
-            value=5,
-            step=1,
-            help="Number of recommendations to show"
-        )
-
-    # Preferences in expandable section
-    with st.expander("⚙️ Advanced Settings (Optional)", expanded=False):
-        use_preferences = st.checkbox("Enable personalized preferences")
-
+        # Preferences (option lists are only fetched while shown)
         preferences = None
         if use_preferences:
-            col1, col2 = st.columns(2)
-
-            with col1:
-                # Genre preferences
-                available_genres = recommender.get_available_genres()
-                selected_genres = st.multiselect(
-                    "Preferred Genres:",
-                    options=available_genres,
-                    default=[],
-                    help="Boost movies with these genres"
-                )
+            available_genres = _cached_genres(recommender, recommender.data_path)
+            available_languages = _cached_languages(recommender, recommender.data_path)
 
-                # Minimum rating
-                min_rating = st.slider(
-                    "Minimum Rating:",
-                    min_value=0.0,
-                    max_value=10.0,
-                    value=0.0,
-                    step=0.5,
-                    help="Soft filter for movie ratings"
-                )
+            with st.expander("⚙️ Advanced Settings (Optional)", expanded=True):
+                col1, col2 = st.columns(2)
 
-            with col2:
-                # Language preferences
-                available_languages = recommender.get_available_languages()
-                selected_languages = st.multiselect(
-                    "Preferred Languages:",
-                    options=available_languages,
-                    default=[],
-                    help="Boost movies in these languages"
-                )
+                with col1:
+                    # Genre preferences
+                    selected_genres = st.multiselect(
+                        "Preferred Genres:",
+                        options=available_genres,
+                        default=[],
+                        help="Boost movies with these genres"
+                    )
+
+                    # Minimum rating
+                    min_rating = st.slider(
+                        "Minimum Rating:",
+                        min_value=0.0,
+                        max_value=10.0,
+                        value=0.0,
+                        step=0.5,
+                        help="Soft filter for movie ratings"
+                    )
 
-                # Weights
-                genre_weight = st.slider(
-                    "Genre importance:",
-                    min_value=0.0,
-                    max_value=1.0,
-                    value=0.3,
-                    step=0.1,
-                    help="How much to boost movies with preferred genres"
-                )
+                with col2:
+                    # Language preferences
+                    selected_languages = st.multiselect(
+                        "Preferred Languages:",
+                        options=available_languages,
+                        default=[],
+                        help="Boost movies in these languages"
+                    )
+
+                    # Weights
+                    genre_weight = st.slider(
+                        "Genre importance:",
+                        min_value=0.0,
+                        max_value=1.0,
+                        value=0.3,
+                        step=0.1,
+                        help="How much to boost movies with preferred genres"
+                    )
 
             # Build preferences object
             if selected_genres or selected_languages or min_rating > 0:
@@ -204,18 +252,15 @@ def main():
                     min_rating=min_rating
                 )
 
-    st.markdown("---")
-
-    # Get recommendations button (centered)
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        search_button = st.button(
-            "🔍 Get Recommendations",
-            type="primary",
-            use_container_width=True,
-            disabled=(selected_movie is None),
-            key="search_recommendations"
-        )
+        # Get recommendations button (centered)
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            search_button = st.form_submit_button(
+                "🔍 Get Recommendations",
+                type="primary",
+                use_container_width=True,
+                disabled=(selected_movie is None)
+            )
 
     # Process recommendations
     if search_button and selected_movie:
@@ -270,17 +315,20 @@ def main():
 
     # Footer with dataset info in sidebar
     with st.sidebar:
+        available_genres = _cached_genres(recommender, recommender.data_path)
+        available_languages = _cached_languages(recommender, recommender.data_path)
+
         st.markdown("---")
         st.markdown("### 📊 Dataset Info")
         st.info(f"""
         **Total Movies:** {len(recommender.movies)}  
-        **Genres:** {len(recommender.get_available_genres())}  
-        **Languages:** {len(recommender.get_available_languages())}
+        **Genres:** {len(available_genres)}  
+        **Languages:** {len(available_languages)}
         """)
 
         st.markdown("---")
         st.markdown("### 🎭 Available Genres")
-        st.caption(", ".join(recommender.get_available_genres()))
+        st.caption(", ".join(available_genres))
 
         st.markdown("---")
         st.markdown("### ℹ️ About")
@@ -0,0 +1,6 @@
+"""
+Root pytest configuration.
+
+Its presence makes pytest put the repository root on sys.path, so tests
+import the project packages (models, ingestion, ...) directly.
+"""
@@ -5,6 +5,8 @@ This script demonstrates how to use the uploaded movies.csv dataset
 which contains 4803 movies in TMDB format.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
 from main import MovieRecommender
 from ingestion.data_config import TMDBConfig
 from preferences.preference_engine import UserPreferences
@@ -29,12 +31,32 @@ def main():
     print(f"\n✓ Loaded {len(recommender.movies)} movies!")
     print(f"✓ Available genres: {', '.join(recommender.get_available_genres()[:10])}...")
     
+    prefs = UserPreferences(
+        preferred_genres=['Action', 'Adventure', 'Science Fiction'],
+        min_rating=7.0,
+        genre_weight=0.4
+    )
+    
+    # The three example queries are independent and read-only, so run
+    # them together and print the results in order afterwards
+    queries = [
+        ("Avatar", None),
+        ("Avatar", prefs),
+        ("The Dark Knight", None),
+    ]
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        futures = [
+            executor.submit(recommender.get_recommendations, title, preferences=p, top_k=5)
+            for title, p in queries
+        ]
+        example_results = [future.result() for future in futures]
+    
     # Example 1: Basic recommendations
     print("\n" + "=" * 70)
     print("EXAMPLE 1: Movies Similar to Avatar")
     print("=" * 70)
     
-    results = recommender.get_recommendations("Avatar", top_k=5)
+    results = example_results[0]
     
     for i, rec in enumerate(results, 1):
         print(f"\n{i}. {rec['title']}")
@@ -47,17 +69,7 @@ def main():
     print("EXAMPLE 2: Action Movies Similar to Avatar (Rating > 7.0)")
     print("=" * 70)
     
-    prefs = UserPreferences(
-        preferred_genres=['Action', 'Adventure', 'Science Fiction'],
-        min_rating=7.0,
-        genre_weight=0.4
-    )
-    
-    results = recommender.get_recommendations(
-        "Avatar",
-        preferences=prefs,
-        top_k=5
-    )
+    results = example_results[1]
     
     for i, rec in enumerate(results, 1):
         print(f"\n{i}. {rec['title']}")
@@ -69,7 +81,7 @@ def main():
     print("EXAMPLE 3: Movies Similar to The Dark Knight")
     print("=" * 70)
     
-    results = recommender.get_recommendations("The Dark Knight", top_k=5)
+    results = example_results[2]
     
     for i, rec in enumerate(results, 1):
         print(f"\n{i}. {rec['title']}")
@@ -8,18 +8,61 @@ Responsibilities:
 This layer transforms canonical data into ML-ready representations.
 """
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import MultiLabelBinarizer
-from typing import List, Dict, Tuple
+import pandas as pd
+from scipy import sparse
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import (
+    HashingVectorizer,
+    TfidfTransformer,
+    TfidfVectorizer,
+)
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import MultiLabelBinarizer, normalize
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from array import array
+import joblib
 import logging
-import pickle
+import operator
+import os
 from pathlib import Path
 
-from models.movie import Movie
+from models.movie import Movie, MovieTable
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fields read from every Movie while building features
+_MOVIE_COLUMNS = operator.attrgetter('overview', 'genres', 'rating', 'movie_id')
+
+# Largest movie ID served by the array lookup table (16 MB of int32)
+_MAX_ID_LOOKUP_SIZE = 1 << 22
+
+# Fewest overviews per shard worth handing to a hashing thread
+_MIN_DOCS_PER_SHARD = 512
+
+# zlib level used for persisted vectorizers
+_JOBLIB_COMPRESSION = 3
+
+# CSR buffers of the persisted feature matrix, one raw .npy file each
+_FEATURE_ARRAYS = ('data', 'indices', 'indptr')
+
+
+def _save_array(path: Path, array: np.ndarray) -> None:
+    """
+    Write an array as .npy, replacing any existing file atomically.
+    
+    Readers that memory-mapped the old file keep their (unlinked) copy
+    instead of seeing it truncated mid-write.
+    
+    Args:
+        path: Destination .npy file
+        array: Array to save
+    """
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(tmp_path, path)
+
 
 class FeatureBuilder:
     """
@@ -31,153 +74,335 @@ class FeatureBuilder:
         self,
         max_features: int = 5000,
         ngram_range: Tuple[int, int] = (1, 2),
-        min_df: int = 1
+        min_df: int = 1,
+        use_hashing: bool = False,
+        n_hash_features: int = 2 ** 13,
+        use_idf: bool = True,
+        n_jobs: Optional[int] = None
     ):
         """
         Initialize the feature builder.
         
         Args:
             max_features: Maximum number of TF-IDF features
+                (vocabulary mode only)
             ngram_range: Range of n-grams for TF-IDF
             min_df: Minimum document frequency for TF-IDF
+                (vocabulary mode only)
+            use_hashing: Hash tokens instead of learning a vocabulary
+            n_hash_features: Number of hash buckets when use_hashing is set
+            use_idf: Re-weight hashed counts by inverse document frequency;
+                without it hashing mode learns nothing from the corpus, so
+                a movie's text features do not depend on the catalogue
+            n_jobs: Threads used to hash overview shards in parallel
+                (hashing mode only; None uses every CPU)
         """
         self.max_features = max_features
         self.ngram_range = ngram_range
         self.min_df = min_df
+        self.use_hashing = use_hashing
+        self.n_hash_features = n_hash_features
+        self.use_idf = use_idf
+        self.n_jobs = n_jobs
         
         # Vectorizers (fitted during build)
         self.tfidf_vectorizer = None
         self.genre_encoder = None
         
-        # Index mappings
-        self.movie_id_to_index: Dict[int, int] = {}
-        self.index_to_movie_id: Dict[int, int] = {}
+        # Last built (or loaded) feature matrix
+        self.feature_matrix: Optional[csr_matrix] = None
         
-    def _build_text_features(self, movies: List[Movie]) -> np.ndarray:
+        # Index mappings: index_to_movie_id is a dense array over matrix
+        # rows; movie IDs are resolved through an array lookup table when
+        # they are small enough, otherwise through movie_id_to_index
+        self.index_to_movie_id: np.ndarray = np.empty(0, dtype=np.int64)
+        self.movie_id_to_index: Optional[Dict[int, int]] = None
+        self._id_lookup: Optional[np.ndarray] = None
+        
+    def _extract_columns(
+        self,
+        movies: Union[Iterable[Movie], MovieTable]
+    ) -> Tuple[List[str], List[List[str]], np.ndarray, np.ndarray]:
         """
-        Extract TF-IDF features from movie overviews.
+        Extract every per-movie field needed for features in a single pass.
+        
+        The input is consumed exactly once, so it may be a generator that
+        streams movies from disk. A MovieTable already holds the columns,
+        which are used without touching any per-movie object.
         
         Args:
-            movies: List of Movie objects
+            movies: Iterable of Movie objects, or a MovieTable
             
         Returns:
-            TF-IDF feature matrix (n_movies, n_features)
+            Tuple of (overviews, genre_lists, ratings, movie_ids)
         """
-        logger.info("Building text features...")
+        if isinstance(movies, MovieTable):
+            # Ratings are rescaled in place later, so never hand out the
+            # table's own array
+            return (
+                movies.overview.tolist(),
+                movies.genres,
+                np.array(movies.rating, dtype=np.float32),
+                np.asarray(movies.movie_id, dtype=np.int64)
+            )
+        
+        overviews: List[str] = []
+        genre_lists: List[List[str]] = []
+        ratings = array('f')
+        movie_ids = array('q')
+        
+        for overview, genres, rating, movie_id in map(_MOVIE_COLUMNS, movies):
+            overviews.append(overview)
+            genre_lists.append(genres)
+            ratings.append(rating)
+            movie_ids.append(movie_id)
+        
+        return (
+            overviews,
+            genre_lists,
+            np.frombuffer(ratings, dtype=np.float32),
+            np.frombuffer(movie_ids, dtype=np.int64)
+        )
+    
+    def _create_index_mappings(self, movie_ids: np.ndarray) -> None:
+        """
+        Create bidirectional mappings between movie IDs and matrix indices.
         
-        # Extract overviews
-        overviews = [movie.overview for movie in movies]
+        Non-negative IDs below _MAX_ID_LOOKUP_SIZE get an int32 lookup table
+        indexed by movie ID (-1 marks unknown IDs); anything else falls back
+        to a dict.
         
-        # Initialize and fit TF-IDF vectorizer
-        self.tfidf_vectorizer = TfidfVectorizer(
-            max_features=self.max_features,
-            ngram_range=self.ngram_range,
-            min_df=self.min_df,
-            stop_words='english',
-            lowercase=True,
-            strip_accents='unicode'
+        Args:
+            movie_ids: Movie ID of each matrix row
+        """
+        self.index_to_movie_id = np.asarray(movie_ids, dtype=np.int64)
+        n_movies = len(self.index_to_movie_id)
+        
+        if n_movies == 0 or (
+            self.index_to_movie_id.min() >= 0
+            and self.index_to_movie_id.max() < _MAX_ID_LOOKUP_SIZE
+        ):
+            max_id = int(self.index_to_movie_id.max()) if n_movies else -1
+            self._id_lookup = np.full(max_id + 1, -1, dtype=np.int32)
+            self._id_lookup[self.index_to_movie_id] = np.arange(n_movies, dtype=np.int32)
+            self.movie_id_to_index = None
+        else:
+            self._id_lookup = None
+            self.movie_id_to_index = {
+                movie_id: idx
+                for idx, movie_id in enumerate(self.index_to_movie_id.tolist())
+            }
+        
+        logger.info(f"✓ Created index mappings for {n_movies} movies")
+    
+    def _normalize_text(self, overviews: List[str]) -> List[str]:
+        """
+        Lowercase overviews and strip accents in one vectorized pass.
+        
+        Equivalent to the vectorizer's strip_accents='ascii' and
+        lowercase=True, but done once up front with pandas string ops
+        instead of per document inside the tokenizer.
+        
+        Args:
+            overviews: Raw overview text for each movie
+            
+        Returns:
+            Normalized overview text
+        """
+        return (
+            pd.Series(overviews, dtype=object)
+            .str.normalize('NFKD')
+            .str.encode('ascii', 'ignore')
+            .str.decode('ascii')
+            .str.lower()
+            .tolist()
         )
+    
+    def _build_text_features(self, overviews: List[str]) -> csr_matrix:
+        """
+        Extract TF-IDF features from movie overviews.
+        
+        With use_hashing set, tokens are hashed into a fixed number of
+        buckets and re-weighted with a TfidfTransformer, which avoids
+        building and pickling a vocabulary dict. Otherwise a
+        vocabulary-based TfidfVectorizer is fitted.
         
-        # Transform to TF-IDF matrix
-        tfidf_matrix = self.tfidf_vectorizer.fit_transform(overviews)
+        Hashing is stateless, so in hashing mode the overviews are split
+        into shards and hashed on a thread pool; only the IDF weights are
+        fitted on the stacked counts (nothing is, with use_idf off).
+        
+        Args:
+            overviews: Overview text for each movie
+            
+        Returns:
+            Sparse TF-IDF feature matrix (n_movies, n_features)
+        """
+        logger.info("Building text features...")
+        
+        # Initialize and fit TF-IDF vectorizer
+        if self.use_hashing:
+            self.tfidf_vectorizer = make_pipeline(
+                HashingVectorizer(
+                    n_features=self.n_hash_features,
+                    ngram_range=self.ngram_range,
+                    stop_words='english',
+                    lowercase=False,
+                    strip_accents=None,
+                    alternate_sign=False,
+                    norm=None,
+                    dtype=np.float32
+                ),
+                TfidfTransformer(use_idf=self.use_idf, sublinear_tf=True)
+            )
+        else:
+            self.tfidf_vectorizer = TfidfVectorizer(
+                max_features=self.max_features,
+                ngram_range=self.ngram_range,
+                min_df=self.min_df,
+                stop_words='english',
+                lowercase=False,
+                strip_accents=None,
+                dtype=np.float32
+            )
+        
+        # Transform to TF-IDF matrix (text is normalized up front)
+        texts = self._normalize_text(overviews)
+        if self.use_hashing:
+            hasher, tfidf = self.tfidf_vectorizer[0], self.tfidf_vectorizer[-1]
+            n_shards = max(1, min(
+                joblib.effective_n_jobs(self.n_jobs or -1),
+                len(texts) // _MIN_DOCS_PER_SHARD
+            ))
+            if n_shards > 1:
+                bounds = np.linspace(0, len(texts), n_shards + 1, dtype=int)
+                counts = sparse.vstack(
+                    joblib.Parallel(n_jobs=n_shards, prefer='threads')(
+                        joblib.delayed(hasher.transform)(texts[start:stop])
+                        for start, stop in zip(bounds[:-1], bounds[1:])
+                    ),
+                    format='csr'
+                )
+            else:
+                counts = hasher.transform(texts)
+            tfidf_matrix = tfidf.fit_transform(counts)
+        else:
+            tfidf_matrix = self.tfidf_vectorizer.fit_transform(texts)
         
         logger.info(f"✓ TF-IDF matrix shape: {tfidf_matrix.shape}")
-        return tfidf_matrix.toarray()
+        return tfidf_matrix.tocsr()
     
-    def _build_genre_features(self, movies: List[Movie]) -> np.ndarray:
+    def _build_genre_features(self, genre_lists: List[List[str]]) -> csr_matrix:
         """
         Build one-hot encoded genre features.
         
         Args:
-            movies: List of Movie objects
+            genre_lists: Genre list for each movie
             
         Returns:
-            Genre feature matrix (n_movies, n_genres)
+            Sparse genre feature matrix (n_movies, n_genres)
         """
         logger.info("Building genre features...")
         
-        # Extract genre lists
-        genre_lists = [movie.genres for movie in movies]
+        # Build the indicator CSR directly in one pass, assigning each
+        # genre a column the first time it is seen
+        vocabulary: Dict[str, int] = {}
+        indices = array('i')
+        indptr = array('i', [0])
+        for genres in genre_lists:
+            indices.extend(
+                vocabulary.setdefault(genre, len(vocabulary))
+                for genre in dict.fromkeys(genres)
+            )
+            indptr.append(len(indices))
+        
+        # Renumber columns into sorted genre order
+        classes = sorted(vocabulary)
+        rank = np.empty(len(classes), dtype=np.intc)
+        rank[[vocabulary[genre] for genre in classes]] = np.arange(len(classes), dtype=np.intc)
+        columns = rank[np.frombuffer(indices, dtype=np.intc)]
+        
+        genre_matrix = csr_matrix(
+            (np.ones(len(columns), dtype=np.float32), columns, np.frombuffer(indptr, dtype=np.intc)),
+            shape=(len(genre_lists), len(classes))
+        )
+        genre_matrix.sort_indices()
         
-        # Initialize and fit MultiLabelBinarizer
-        self.genre_encoder = MultiLabelBinarizer()
-        genre_matrix = self.genre_encoder.fit_transform(genre_lists)
+        # Keep a fitted encoder so the genre vocabulary is persisted as before
+        self.genre_encoder = MultiLabelBinarizer(classes=classes).fit([])
         
         logger.info(f"✓ Genre matrix shape: {genre_matrix.shape}")
-        logger.info(f"✓ Unique genres: {list(self.genre_encoder.classes_)}")
+        logger.info(f"✓ Unique genres: {classes}")
         return genre_matrix
     
-    def _build_rating_features(self, movies: List[Movie]) -> np.ndarray:
+    def _build_rating_features(self, ratings: np.ndarray) -> csr_matrix:
         """
         Build rating-based features.
         
         Args:
-            movies: List of Movie objects
+            ratings: float32 array of movie ratings (0-10 scale);
+                rescaled in place
             
         Returns:
-            Rating feature matrix (n_movies, 1)
+            Sparse rating feature column (n_movies, 1)
         """
-        ratings = np.array([movie.rating for movie in movies]).reshape(-1, 1)
+        # Normalize ratings to 0-1 scale without a temporary
+        np.divide(ratings, 10.0, out=ratings)
         
-        # Normalize ratings to 0-1 scale
-        ratings = ratings / 10.0
-        
-        return ratings
-    
-    def _create_index_mappings(self, movies: List[Movie]) -> None:
-        """
-        Create bidirectional mappings between movie IDs and matrix indices.
-        
-        Args:
-            movies: List of Movie objects
-        """
-        self.movie_id_to_index = {
-            movie.movie_id: idx for idx, movie in enumerate(movies)
-        }
-        self.index_to_movie_id = {
-            idx: movie.movie_id for idx, movie in enumerate(movies)
-        }
-        logger.info(f"✓ Created index mappings for {len(movies)} movies")
+        return csr_matrix(ratings.reshape(-1, 1))
     
     def build_features(
         self,
-        movies: List[Movie],
+        movies: Union[Iterable[Movie], MovieTable],
         include_genres: bool = True,
         include_ratings: bool = True
-    ) -> np.ndarray:
+    ) -> Union[np.ndarray, csr_matrix]:
         """
         Build complete feature matrix from Movie objects.
         
+        The matrix is kept sparse (CSR) end-to-end: TF-IDF rows are
+        overwhelmingly zero, so densifying them only inflates memory
+        and slows down every downstream similarity computation. Rows are
+        L2-normalized, so cosine similarity reduces to a plain dot product.
+        
         Args:
-            movies: List of Movie objects
+            movies: Iterable of Movie objects (consumed once), or a
+                MovieTable from MovieDataLoader.load_table
             include_genres: Whether to include genre features
             include_ratings: Whether to include rating features
             
         Returns:
-            Combined feature matrix (n_movies, n_total_features)
+            Combined sparse, row-normalized feature matrix
+            (n_movies, n_total_features)
         """
-        logger.info(f"Building features for {len(movies)} movies...")
+        # Extract columns in one pass, then drop our reference to the
+        # movies so they can be collected before TF-IDF runs
+        overviews, genre_lists, ratings, movie_ids = self._extract_columns(movies)
+        del movies
+        
+        logger.info(f"Building features for {len(movie_ids)} movies...")
         
         # Create index mappings
-        self._create_index_mappings(movies)
+        self._create_index_mappings(movie_ids)
         
         # Build individual feature components
-        text_features = self._build_text_features(movies)
+        text_features = self._build_text_features(overviews)
         
         feature_components = [text_features]
         
         if include_genres:
-            genre_features = self._build_genre_features(movies)
+            genre_features = self._build_genre_features(genre_lists)
             feature_components.append(genre_features)
         
         if include_ratings:
-            rating_features = self._build_rating_features(movies)
+            rating_features = self._build_rating_features(ratings)
             feature_components.append(rating_features)
         
-        # Concatenate all features
-        feature_matrix = np.hstack(feature_components)
+        # Concatenate all features and re-normalize the stacked rows
+        feature_matrix = sparse.hstack(feature_components, format='csr')
+        normalize(feature_matrix, norm='l2', copy=False)
         
         logger.info(f"✓ Final feature matrix shape: {feature_matrix.shape}")
+        self.feature_matrix = feature_matrix
         return feature_matrix
     
     def get_movie_index(self, movie_id: int) -> int:
@@ -193,9 +418,41 @@ class FeatureBuilder:
         Raises:
             KeyError: If movie ID not found
         """
-        if movie_id not in self.movie_id_to_index:
+        if self._id_lookup is not None:
+            index = (
+                self._id_lookup[movie_id]
+                if 0 <= movie_id < len(self._id_lookup) else -1
+            )
+        else:
+            index = self.movie_id_to_index.get(movie_id, -1)
+        
+        if index < 0:
             raise KeyError(f"Movie ID {movie_id} not found in index")
-        return self.movie_id_to_index[movie_id]
+        return int(index)
+    
+    def get_movie_indices(self, movie_ids: np.ndarray) -> np.ndarray:
+        """
+        Get matrix indices for a batch of movie IDs.
+        
+        Args:
+            movie_ids: Array of movie IDs to look up
+            
+        Returns:
+            int32 array of matrix indices (-1 for unknown IDs)
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        
+        if self._id_lookup is None:
+            return np.fromiter(
+                (self.movie_id_to_index.get(movie_id, -1) for movie_id in movie_ids.tolist()),
+                dtype=np.int32,
+                count=len(movie_ids)
+            )
+        
+        in_range = (movie_ids >= 0) & (movie_ids < len(self._id_lookup))
+        indices = np.full(len(movie_ids), -1, dtype=np.int32)
+        indices[in_range] = self._id_lookup[movie_ids[in_range]]
+        return indices
     
     def get_movie_id(self, index: int) -> int:
         """
@@ -207,7 +464,7 @@ class FeatureBuilder:
         Returns:
             Movie ID
         """
-        return self.index_to_movie_id[index]
+        return int(self.index_to_movie_id[index])
     
     def save(self, save_dir: str) -> None:
         """
@@ -220,42 +477,70 @@ class FeatureBuilder:
         save_path.mkdir(parents=True, exist_ok=True)
         
         # Save vectorizers
-        with open(save_path / 'tfidf_vectorizer.pkl', 'wb') as f:
-            pickle.dump(self.tfidf_vectorizer, f)
-        
-        with open(save_path / 'genre_encoder.pkl', 'wb') as f:
-            pickle.dump(self.genre_encoder, f)
+        joblib.dump(
+            self.tfidf_vectorizer,
+            save_path / 'tfidf_vectorizer.joblib',
+            compress=_JOBLIB_COMPRESSION
+        )
+        joblib.dump(
+            self.genre_encoder,
+            save_path / 'genre_encoder.joblib',
+            compress=_JOBLIB_COMPRESSION
+        )
         
         # Save mappings
-        with open(save_path / 'mappings.pkl', 'wb') as f:
-            pickle.dump({
-                'movie_id_to_index': self.movie_id_to_index,
-                'index_to_movie_id': self.index_to_movie_id
-            }, f)
+        np.savez(
+            save_path / 'mappings.npz',
+            index_to_movie_id=self.index_to_movie_id
+        )
+        
+        # Save the feature matrix itself so it need not be re-derived.
+        # Each CSR buffer is a raw .npy file, so load() can memory-map it.
+        if self.feature_matrix is not None:
+            matrix = self.feature_matrix.tocsr()
+            for name in _FEATURE_ARRAYS:
+                _save_array(save_path / f'features_{name}.npy', getattr(matrix, name))
+            _save_array(save_path / 'features_shape.npy', np.array(matrix.shape))
+        else:
+            # Drop any matrix from an earlier save; it does not belong to
+            # these vectorizers and mappings. The shape file goes first,
+            # since load() takes its presence to mean a matrix was saved.
+            for name in ('shape',) + _FEATURE_ARRAYS:
+                (save_path / f'features_{name}.npy').unlink(missing_ok=True)
         
         logger.info(f"✓ Feature builder saved to {save_dir}")
     
-    def load(self, save_dir: str) -> None:
+    def load(self, save_dir: str, mmap_mode: Optional[str] = None) -> None:
         """
         Load a previously saved feature builder state.
         
         Args:
             save_dir: Directory containing saved artifacts
+            mmap_mode: Passed to np.load for the feature matrix buffers;
+                'r' maps them read-only, so processes loading the same
+                cache share one copy in the page cache
         """
         save_path = Path(save_dir)
         
         # Load vectorizers
-        with open(save_path / 'tfidf_vectorizer.pkl', 'rb') as f:
-            self.tfidf_vectorizer = pickle.load(f)
-        
-        with open(save_path / 'genre_encoder.pkl', 'rb') as f:
-            self.genre_encoder = pickle.load(f)
+        self.tfidf_vectorizer = joblib.load(save_path / 'tfidf_vectorizer.joblib')
+        self.genre_encoder = joblib.load(save_path / 'genre_encoder.joblib')
         
         # Load mappings
-        with open(save_path / 'mappings.pkl', 'rb') as f:
-            mappings = pickle.load(f)
-            self.movie_id_to_index = mappings['movie_id_to_index']
-            self.index_to_movie_id = mappings['index_to_movie_id']
+        with np.load(save_path / 'mappings.npz') as mappings:
+            self._create_index_mappings(mappings['index_to_movie_id'])
+        
+        # Load the feature matrix (absent if save() ran before a build)
+        shape_path = save_path / 'features_shape.npy'
+        if shape_path.exists():
+            buffers = tuple(
+                np.load(save_path / f'features_{name}.npy', mmap_mode=mmap_mode)
+                for name in _FEATURE_ARRAYS
+            )
+            shape = tuple(np.load(shape_path).tolist())
+            self.feature_matrix = csr_matrix(buffers, shape=shape, copy=False)
+        else:
+            self.feature_matrix = None
         
         logger.info(f"✓ Feature builder loaded from {save_dir}")
 
@@ -277,7 +562,10 @@ if __name__ == "__main__":
     print(f"Feature Matrix Shape: {feature_matrix.shape}")
     print(f"{'='*60}")
     print(f"\nFeature breakdown:")
-    print(f"  TF-IDF features: vocabulary size = {len(builder.tfidf_vectorizer.vocabulary_)}")
+    if builder.use_hashing:
+        print(f"  TF-IDF features: {builder.n_hash_features} hash buckets")
+    else:
+        print(f"  TF-IDF features: vocabulary size = {len(builder.tfidf_vectorizer.vocabulary_)}")
     print(f"  Genre features: {len(builder.genre_encoder.classes_)} genres")
     print(f"  Rating features: 1")
     
@@ -4,8 +4,32 @@ Maps your dataset columns to the required Movie model fields.
 This makes the system work with ANY movie dataset!
 """
 from typing import Dict, List, Optional, Callable
+import numpy as np
 import pandas as pd
 
+try:
+    import orjson as _json  # faster JSON genre parsing
+except ImportError:  # optional: fall back to the standard library
+    import json as _json
+
+
+def intern_genres(genre_lists) -> List[List[str]]:
+    """
+    Share one string object per distinct genre name.
+    
+    A large catalogue repeats a few dozen genre names across every
+    movie; pooling them keeps one copy of each instead of one per movie.
+    
+    Args:
+        genre_lists: Iterable of genre name sequences
+        
+    Returns:
+        List of genre lists built from the pooled strings
+    """
+    pool: Dict[str, str] = {}
+    intern = pool.setdefault
+    return [[intern(g, g) for g in genres] for genres in genre_lists]
+
 
 class DataConfig:
     """
@@ -88,20 +112,62 @@ class DataConfig:
             return ['Unknown']
         
         # Handle JSON format: [{"name": "Action"}, {"name": "Drama"}]
-        if genre_string.startswith('['):
-            import json
+        if genre_string[:1] == '[':
             try:
-                genre_list = json.loads(genre_string)
+                genre_list = _json.loads(genre_string)
                 if isinstance(genre_list, list) and len(genre_list) > 0:
                     if isinstance(genre_list[0], dict):
                         return [g.get('name', '') for g in genre_list if g.get('name')]
-            except:
+            except (ValueError, AttributeError):
                 pass
         
         # Handle simple comma-separated: "Action, Drama, Thriller"
         genres = [g.strip() for g in str(genre_string).split(',')]
         return [g for g in genres if g] or ['Unknown']
     
+    def parse_genres_series(self, genres: pd.Series) -> List[List[str]]:
+        """
+        Parse a whole column of genre strings at once.
+        
+        Equivalent to calling genre_parser on every value, but the default
+        comma-separated format is split with pandas string methods and
+        only values starting with '[' go through the JSON parser. Custom
+        genre parsers are still applied value by value.
+        
+        Args:
+            genres: Genre strings in dataset format
+            
+        Returns:
+            List of genre names for each value
+        """
+        if getattr(self.genre_parser, '__func__', None) is not DataConfig._default_genre_parser:
+            return intern_genres(self.genre_parser(g) for g in genres.tolist())
+        
+        parsed: List[Optional[List[str]]] = [None] * len(genres)
+        
+        # Missing or empty values are found with one vectorized check
+        missing = (genres.isna() | genres.eq('')).to_numpy()
+        for i in missing.nonzero()[0]:
+            parsed[i] = ['Unknown']
+        
+        present = (~missing).nonzero()[0]
+        genres = genres[~missing].astype(str)
+        for i, parts in zip(present, genres.str.strip().str.split(r'\s*,\s*', regex=True).tolist()):
+            parsed[i] = [g for g in parts if g] or ['Unknown']
+        
+        # Handle JSON format: [{"name": "Action"}, {"name": "Drama"}]
+        is_json = genres.str.startswith('[').to_numpy()
+        for i, genre_string in zip(present[is_json], genres[is_json].tolist()):
+            try:
+                genre_list = _json.loads(genre_string)
+                if isinstance(genre_list, list) and len(genre_list) > 0:
+                    if isinstance(genre_list[0], dict):
+                        parsed[i] = [g.get('name', '') for g in genre_list if g.get('name')]
+            except (ValueError, AttributeError):
+                pass
+        
+        return intern_genres(parsed)
+    
     def _default_rating_normalizer(self, rating: float) -> float:
         """
         Default rating normalizer.
@@ -115,6 +181,26 @@ class DataConfig:
         except:
             return 0.0
     
+    def normalize_rating_series(self, ratings: pd.Series) -> np.ndarray:
+        """
+        Normalize a whole column of ratings at once.
+        
+        Equivalent to calling rating_normalizer on every value; the
+        default normalizer becomes a single clip to the 0-10 range.
+        Custom rating normalizers are still applied value by value.
+        
+        Args:
+            ratings: Raw rating values
+            
+        Returns:
+            float64 array of normalized ratings (0-10 scale)
+        """
+        if getattr(self.rating_normalizer, '__func__', None) is not DataConfig._default_rating_normalizer:
+            return np.array([self.rating_normalizer(r) for r in ratings.tolist()], dtype=np.float64)
+        
+        ratings = pd.to_numeric(ratings, errors='coerce').fillna(0.0)
+        return np.clip(ratings.to_numpy(dtype=np.float64), 0.0, 10.0)
+    
     def get_required_columns(self) -> List[str]:
         """Get list of required column names in the dataset."""
         return list(self.column_mapping.values())
@@ -129,21 +215,20 @@ class DataConfig:
         Returns:
             DataFrame with standardized column names
         """
-        # Create mapped DataFrame
-        mapped_df = pd.DataFrame()
-        
         # Map required columns
-        for standard_name, dataset_column in self.column_mapping.items():
+        for dataset_column in self.column_mapping.values():
             if dataset_column not in df.columns:
                 raise ValueError(f"Required column '{dataset_column}' not found in dataset!")
-            mapped_df[standard_name] = df[dataset_column]
+        mapping = dict(self.column_mapping)
         
         # Map optional columns
         for standard_name, dataset_column in self.optional_mapping.items():
             if dataset_column and dataset_column in df.columns:
-                mapped_df[standard_name] = df[dataset_column]
+                mapping[standard_name] = dataset_column
         
-        return mapped_df
+        # Select and relabel in one step (positional, so one dataset
+        # column may back several standard fields)
+        return df[list(mapping.values())].set_axis(list(mapping.keys()), axis=1)
 
 
 # ============================================================================
@@ -201,12 +286,40 @@ class MovieLensConfig(DataConfig):
         if pd.isna(genre_string) or not genre_string:
             return ['Unknown']
         return [g.strip() for g in str(genre_string).split('|') if g.strip()]
+    
+    def parse_genres_series(self, genres: pd.Series) -> List[List[str]]:
+        """Parse a column of pipe-separated genres at once."""
+        if getattr(self.genre_parser, '__func__', None) is not MovieLensConfig._default_genre_parser:
+            return intern_genres(self.genre_parser(g) for g in genres.tolist())
+        
+        is_missing = (genres.isna() | genres.eq('')).to_numpy()
+        split = genres.fillna('').astype(str).str.strip().str.split(r'\s*\|\s*', regex=True)
+        return intern_genres(
+            ['Unknown'] if missing else [g for g in parts if g]
+            for parts, missing in zip(split.tolist(), is_missing)
+        )
 
 
 # ============================================================================
 # AUTO-DETECTION
 # ============================================================================
 
+# Column signatures of the pre-configured formats, checked in order
+_TMDB_SIGNATURE = frozenset({'id', 'title', 'genres', 'overview', 'vote_average'})
+_IMDB_SIGNATURE = frozenset({'imdb_id', 'title', 'plot', 'imdb_rating'})
+_MOVIELENS_SIGNATURE = frozenset({'movieId', 'title', 'genres'})
+
+# Candidate dataset columns for each required field, in preference order
+_FIELD_CANDIDATES = {
+    'movie_id_col': ('id', 'movie_id', 'movieId', 'imdb_id', 'tmdb_id'),
+    'title_col': ('title', 'movie_title', 'name'),
+    'genres_col': ('genres', 'genre', 'categories'),
+    'overview_col': ('overview', 'description', 'plot', 'summary', 'synopsis'),
+    'language_col': ('language', 'original_language', 'lang', 'spoken_languages'),
+    'rating_col': ('rating', 'vote_average', 'imdb_rating', 'score', 'user_rating'),
+}
+
+
 def auto_detect_config(df: pd.DataFrame) -> DataConfig:
     """
     Automatically detect the best configuration for a dataset.
@@ -217,65 +330,34 @@ def auto_detect_config(df: pd.DataFrame) -> DataConfig:
     Returns:
         DataConfig instance
     """
-    columns = set(df.columns)
+    columns = frozenset(df.columns)
     
     # Check for TMDB format
-    if {'id', 'title', 'genres', 'overview', 'vote_average'}.issubset(columns):
+    if _TMDB_SIGNATURE <= columns:
         print("✓ Detected TMDB format")
         return TMDBConfig()
     
     # Check for IMDB format
-    if {'imdb_id', 'title', 'plot', 'imdb_rating'}.issubset(columns):
+    if _IMDB_SIGNATURE <= columns:
         print("✓ Detected IMDB format")
         return IMDBConfig()
     
     # Check for MovieLens format
-    if {'movieId', 'title', 'genres'}.issubset(columns):
+    if _MOVIELENS_SIGNATURE <= columns:
         print("✓ Detected MovieLens format")
         return MovieLensConfig()
     
     # Default: try to infer
     print("⚠ Could not auto-detect format, attempting to infer...")
     
+    # Take the first candidate present for each field
     config_kwargs = {}
+    for field, candidates in _FIELD_CANDIDATES.items():
+        match = next((col for col in candidates if col in columns), None)
+        if match is not None:
+            config_kwargs[field] = match
     
-    # Infer movie_id column
-    for col in ['id', 'movie_id', 'movieId', 'imdb_id', 'tmdb_id']:
-        if col in columns:
-            config_kwargs['movie_id_col'] = col
-            break
-    
-    # Infer title column
-    for col in ['title', 'movie_title', 'name']:
-        if col in columns:
-            config_kwargs['title_col'] = col
-            break
-    
-    # Infer genres column
-    for col in ['genres', 'genre', 'categories']:
-        if col in columns:
-            config_kwargs['genres_col'] = col
-            break
-    
-    # Infer overview column
-    for col in ['overview', 'description', 'plot', 'summary', 'synopsis']:
-        if col in columns:
-            config_kwargs['overview_col'] = col
-            break
-    
-    # Infer language column
-    for col in ['language', 'original_language', 'lang', 'spoken_languages']:
-        if col in columns:
-            config_kwargs['language_col'] = col
-            break
-    
-    # Infer rating column
-    for col in ['rating', 'vote_average', 'imdb_rating', 'score', 'user_rating']:
-        if col in columns:
-            config_kwargs['rating_col'] = col
-            break
-    
-    if len(config_kwargs) < 6:
+    if len(config_kwargs) < len(_FIELD_CANDIDATES):
         raise ValueError(
             f"Could not auto-detect all required columns. Found: {config_kwargs}\n"
             "Please create a custom DataConfig manually."
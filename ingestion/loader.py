@@ -9,12 +9,25 @@ Responsibilities:
 NO ML logic here. Pure data engineering.
 """
 import pandas as pd
-from typing import List, Optional
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple, Union
+import hashlib
+import json
 import logging
+import pickle
+import sys
 from pathlib import Path
 
-from models.movie import Movie
-from ingestion.data_config import DataConfig, auto_detect_config
+try:
+    import pyarrow  # enables pandas' multithreaded pyarrow CSV engine
+    import pyarrow.parquet as pq
+except ImportError:  # optional: fall back to the pandas C engine, no cache
+    pyarrow = pq = None
+
+from models.movie import Movie, MovieTable
+from ingestion.data_config import DataConfig, auto_detect_config, intern_genres
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,19 +40,86 @@ class MovieDataLoader:
     Now supports ANY dataset format via DataConfig!
     """
 
-    def __init__(self, data_path: str, config: Optional[DataConfig] = None):
+    def __init__(
+        self,
+        data_path: Union[str, IO],
+        config: Optional[DataConfig] = None,
+        use_arrow: bool = True,
+        chunksize: Optional[int] = None,
+        n_workers: int = 1,
+        cache_path: Optional[str] = None
+    ):
         """
         Initialize the data loader.
 
         Args:
-            data_path: Path to the CSV file containing movie data
+            data_path: Path to the CSV (or, with pyarrow, .parquet) file
+                containing movie data, or an open file-like object holding
+                the CSV (see from_buffer)
             config: DataConfig instance for column mapping (auto-detects if None)
+            use_arrow: Parse the CSV with the pyarrow engine when pyarrow
+                is installed
+            chunksize: Stream the CSV in chunks of this many rows (e.g.
+                100_000) to cap peak memory; chunks are parsed with the
+                pandas C engine
+            n_workers: Worker processes preprocessing chunks in parallel
+                (chunked reads only)
+            cache_path: Parquet file caching the preprocessed dataset;
+                reused while the CSV and config are unchanged (requires
+                pyarrow)
         """
-        self.data_path = Path(data_path)
-        if not self.data_path.exists():
-            raise FileNotFoundError(f"Data file not found: {data_path}")
+        if hasattr(data_path, 'read'):
+            # In-memory CSV: rewound to this position for every read
+            self.data_path = None
+            self._buffer = data_path
+            self._buffer_start = data_path.tell()
+        else:
+            self.data_path = Path(data_path)
+            self._buffer = None
+            if not self.data_path.exists():
+                raise FileNotFoundError(f"Data file not found: {data_path}")
+        self._is_parquet = (
+            self.data_path is not None and self.data_path.suffix.lower() == '.parquet'
+        )
+        if self._is_parquet and pq is None:
+            raise ImportError("Reading Parquet data files requires pyarrow")
 
         self.config = config  # Will be set during load if None
+        self.use_arrow = use_arrow
+        self.chunksize = chunksize
+        self.n_workers = n_workers
+        self.cache_path = Path(cache_path) if cache_path else None
+
+    @classmethod
+    def from_buffer(cls, buffer: IO, **kwargs) -> 'MovieDataLoader':
+        """
+        Create a loader that reads the CSV from an in-memory buffer.
+
+        The buffer is read from its current position (e.g. an
+        io.StringIO). There is no file to fingerprint, so cache_path is
+        ignored.
+
+        Args:
+            buffer: Text or binary file-like object with the CSV
+            **kwargs: Other MovieDataLoader arguments
+
+        Returns:
+            MovieDataLoader reading from buffer
+        """
+        return cls(buffer, **kwargs)
+
+    def __getstate__(self) -> Dict:
+        # Worker processes only preprocess chunks; never ship the buffer
+        state = self.__dict__.copy()
+        state['_buffer'] = None
+        return state
+
+    def _source(self) -> Union[Path, IO]:
+        """The CSV to read: the file path, or the buffer rewound to its start."""
+        if self._buffer is None:
+            return self.data_path
+        self._buffer.seek(self._buffer_start)
+        return self._buffer
 
     def _validate_schema(self, df: pd.DataFrame) -> None:
         """
@@ -62,142 +142,443 @@ class MovieDataLoader:
             )
         logger.info("✓ Schema validation passed")
 
-    def _preprocess_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _read_options(self, header: pd.DataFrame) -> Tuple[List[str], Dict[str, type]]:
+        """
+        Work out which CSV columns to parse, and how.
+
+        Only columns mapped by the config are read. Text columns are read
+        as strings so the parser skips type inference on them; numeric
+        columns keep default inference because they are coerced (and
+        cleaned) during preprocessing. Release dates are read as strings
+        too, so a chunk holding only bare years ('1985') is not inferred
+        as integers and then parsed as epoch offsets.
+
+        Args:
+            header: Empty DataFrame with the CSV's column names
+
+        Returns:
+            Tuple of (usecols, dtype) for pd.read_csv
+        """
+        mapped = list(self.config.column_mapping.values())
+        mapped += [col for col in self.config.optional_mapping.values() if col]
+        usecols = [col for col in dict.fromkeys(mapped) if col in header.columns]
+
+        text_fields = ('title', 'genres', 'overview', 'language')
+        dtype = {self.config.column_mapping[field]: str for field in text_fields}
+        release_date_col = self.config.optional_mapping.get('release_date')
+        if release_date_col in header.columns:
+            dtype[release_date_col] = str
+        return usecols, dtype
+
+    def _read_csv(self, header: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        """
+        Read the mapped data file columns, whole or in chunks.
+
+        Parquet files are read with pyarrow, everything else as CSV.
+
+        Args:
+            header: Empty DataFrame with the data file's column names
+
+        Returns:
+            Iterator over raw DataFrames (a single one unless chunked)
+        """
+        usecols, dtype = self._read_options(header)
+
+        if self._is_parquet:
+            # Columnar file: read only the mapped columns, already typed
+            parquet_file = pq.ParquetFile(self.data_path)
+            if self.chunksize:
+                return (
+                    batch.to_pandas()
+                    for batch in parquet_file.iter_batches(batch_size=self.chunksize, columns=usecols)
+                )
+            return iter([parquet_file.read(columns=usecols).to_pandas()])
+
+        if self.chunksize:
+            return pd.read_csv(
+                self._source(), usecols=usecols, dtype=dtype, chunksize=self.chunksize
+            )
+
+        engine = 'pyarrow' if self.use_arrow and pyarrow is not None else 'c'
+        return iter([pd.read_csv(self._source(), usecols=usecols, dtype=dtype, engine=engine)])
+
+    def _preprocess_dataframe(
+        self,
+        df: pd.DataFrame,
+        seen_ids: Optional[Set[int]] = None
+    ) -> pd.DataFrame:
         """
         Clean and normalize the raw DataFrame.
         Deterministic preprocessing rules.
 
         Args:
             df: Raw DataFrame (with original column names)
+            seen_ids: Movie IDs kept from earlier chunks; rows repeating
+                them are dropped, and the kept IDs are added to the set
 
         Returns:
             Cleaned DataFrame (with standardized column names)
         """
-        df = df.copy()
-
-        # Map columns to standard names
+        # Map columns to standard names (a new frame; the input is untouched)
         df = self.config.map_dataframe(df)
 
-        # Handle missing values (now using standardized column names)
-        df['overview'] = df['overview'].fillna('No description available')
-        df['title'] = df['title'].fillna('Unknown Title')
-        df['genres'] = df['genres'].fillna('Unknown')
-        df['language'] = df['language'].fillna('unknown')
-        df['rating'] = pd.to_numeric(df['rating'], errors='coerce').fillna(0.0)
-
-        # Ensure movie_id is integer
-        df['movie_id'] = pd.to_numeric(df['movie_id'], errors='coerce').fillna(0).astype(int)
+        # Handle missing values and ensure movie_id is integer; assign
+        # replaces just these columns without copying the rest
+        df = df.assign(
+            overview=df['overview'].fillna('No description available'),
+            title=df['title'].fillna('Unknown Title'),
+            genres=df['genres'].fillna('Unknown'),
+            language=df['language'].fillna('unknown').astype('category'),
+            rating=pd.to_numeric(df['rating'], errors='coerce').fillna(0.0),
+            movie_id=pd.to_numeric(df['movie_id'], errors='coerce').fillna(0).astype(int)
+        )
 
-        # Remove duplicates based on movie_id
-        df = df.drop_duplicates(subset=['movie_id'], keep='first')
+        # Remove duplicates based on movie_id and rows with invalid IDs,
+        # filtering once with a combined mask
+        ids = df['movie_id'].to_numpy()
+        keep = (ids > 0) & ~pd.Index(ids).duplicated(keep='first')
+        if seen_ids is not None:
+            keep[keep] = self._claim_new_ids(ids[keep], seen_ids)
+        df = df[keep]
+
+        # Parse genres and normalize ratings for the whole column at once
+        df['genres'] = pd.Series(
+            self.config.parse_genres_series(df['genres']), index=df.index, dtype=object
+        )
+        df['rating'] = self.config.normalize_rating_series(df['rating'])
 
-        # Remove rows with invalid IDs
-        df = df[df['movie_id'] > 0]
+        # Extract release year for the whole column (unparseable dates -> NA)
+        if 'release_date' in df.columns:
+            release_dates = pd.to_datetime(df['release_date'], errors='coerce', format='mixed')
+            df['release_year'] = release_dates.dt.year.astype('Int64')
 
         logger.info(f"✓ Preprocessed {len(df)} movies")
         return df
 
-    def _parse_genres(self, genre_string: str) -> List[str]:
+    @staticmethod
+    def _claim_new_ids(ids: np.ndarray, seen_ids: Set[int]) -> np.ndarray:
         """
-        Parse genre string using config's custom parser.
+        Mark IDs not seen in earlier chunks, and record them as seen.
 
         Args:
-            genre_string: Genre string in dataset format
+            ids: Movie IDs of one chunk (already unique)
+            seen_ids: IDs kept so far; updated in place
 
         Returns:
-            List of genre names
+            Boolean mask of the IDs that were not seen before
         """
-        return self.config.genre_parser(genre_string)
+        new = ~pd.Index(ids).isin(seen_ids) if seen_ids else np.ones(len(ids), dtype=bool)
+        seen_ids.update(ids[new].tolist())
+        return new
 
-    def _normalize_rating(self, rating: float) -> float:
+    def _preprocessed_chunks(self, header: pd.DataFrame) -> Iterator[pd.DataFrame]:
         """
-        Normalize rating using config's normalizer.
+        Read and preprocess the CSV, yielding cleaned chunks in file order.
+
+        With chunksize and more than one worker, chunks are preprocessed
+        in a process pool (if the config can be pickled). At most two
+        chunks per worker are in flight, and IDs already kept from earlier
+        chunks are dropped here in the parent, so the first occurrence
+        still wins.
 
         Args:
-            rating: Raw rating value
+            header: Empty DataFrame with the CSV's column names
 
         Returns:
-            Normalized rating (0-10 scale)
+            Iterator over preprocessed DataFrames
         """
-        return self.config.rating_normalizer(rating)
+        seen_ids = set() if self.chunksize else None
 
-    def _create_movie_object(self, row: pd.Series) -> Movie:
+        parallel = bool(self.chunksize) and self.n_workers > 1
+        if parallel:
+            try:
+                pickle.dumps(self.config)
+            except Exception:  # e.g. a lambda genre_parser
+                logger.warning("Config cannot be sent to worker processes; preprocessing chunks serially")
+                parallel = False
+
+        if not parallel:
+            for chunk in self._read_csv(header):
+                logger.info(f"Loaded {len(chunk)} raw records")
+                yield self._preprocess_dataframe(chunk, seen_ids)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+            pending = deque()
+            for chunk in self._read_csv(header):
+                logger.info(f"Loaded {len(chunk)} raw records")
+                pending.append(executor.submit(_preprocess_chunk, self, chunk))
+                if len(pending) >= 2 * self.n_workers:
+                    df = pending.popleft().result()
+                    yield df[self._claim_new_ids(df['movie_id'].to_numpy(), seen_ids)]
+            while pending:
+                df = pending.popleft().result()
+                yield df[self._claim_new_ids(df['movie_id'].to_numpy(), seen_ids)]
+
+    def fingerprint(self) -> str:
         """
-        Convert a DataFrame row to a Movie object.
+        Fingerprint the data file and config a cache was built from.
+
+        Used to validate both the Parquet cache and caches derived from
+        the loaded movies (features, top-k table). Custom parsers are
+        identified by qualified name only, so editing one in place does
+        not invalidate the cache. Only file sources can be fingerprinted.
+
+        Returns:
+            Hex digest of CSV size/mtime plus the config's column mapping
+            and parser names
+        """
+        stat = self.data_path.stat()
+        parsers = (self.config.genre_parser, self.config.rating_normalizer)
+        key = {
+            'csv': [str(self.data_path.resolve()), stat.st_size, stat.st_mtime_ns],
+            'config': type(self.config).__qualname__,
+            'columns': self.config.column_mapping,
+            'optional': self.config.optional_mapping,
+            'parsers': [f"{getattr(f, '__module__', '')}.{getattr(f, '__qualname__', repr(f))}" for f in parsers],
+        }
+        return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def _preprocessed_frames(self, header: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        """
+        Yield the preprocessed dataset, from the Parquet cache when valid.
+
+        Without cache_path (or pyarrow), or when reading from a buffer,
+        this is _preprocessed_chunks.
+        Otherwise a cache whose fingerprint matches is read back as a
+        single frame; on a miss the chunks are combined and written to
+        the cache.
 
         Args:
-            row: Single row from DataFrame (with standardized column names)
+            header: Empty DataFrame with the CSV's column names
 
         Returns:
-            Movie object
+            Iterator over preprocessed DataFrames
         """
-        # Extract release year if available
-        metadata = {}
-        if 'release_date' in row and pd.notna(row['release_date']):
-            try:
-                year = pd.to_datetime(row['release_date']).year
-                metadata['release_year'] = year
-            except:
-                pass
+        if self.cache_path is None or pq is None or self._buffer is not None:
+            yield from self._preprocessed_chunks(header)
+            return
+
+        fingerprint = self.fingerprint()
+        if self.cache_path.exists():
+            metadata = pq.read_schema(self.cache_path).metadata or {}
+            if metadata.get(b'cinesense_fingerprint', b'').decode() == fingerprint:
+                df = pq.read_table(self.cache_path).to_pandas()
+                # Parquet lists come back as arrays
+                df['genres'] = pd.Series(
+                    intern_genres(df['genres']), index=df.index, dtype=object
+                )
+                logger.info(f"✓ Loaded {len(df)} preprocessed movies from {self.cache_path}")
+                yield df
+                return
+
+        chunks = list(self._preprocessed_chunks(header))
+        df = chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+
+        table = pyarrow.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b'cinesense_fingerprint': fingerprint.encode()
+        })
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, self.cache_path, compression='zstd')
+        logger.info(f"✓ Cached preprocessed movies to {self.cache_path}")
+        yield df
+
+    def _extract_metadata(self, df: pd.DataFrame) -> List[Dict]:
+        """
+        Build the metadata dict for every row from the narrow optional-column frame.
+
+        Args:
+            df: Preprocessed DataFrame (with standardized column names)
 
-        # Add any extra metadata from optional columns
-        for col in ['popularity', 'vote_count', 'runtime']:
-            if col in row.index and pd.notna(row[col]):
-                metadata[col] = row[col]
+        Returns:
+            List of metadata dicts, aligned with the rows of df
+        """
+        # Release year and any extra metadata from optional columns
+        columns = [
+            col for col in ['release_year', 'popularity', 'vote_count', 'runtime']
+            if col in df.columns
+        ]
+        if not columns:
+            return [{} for _ in range(len(df))]
+
+        # Records from the narrow frame; zipping tolist() columns avoids
+        # the per-cell boxing that makes to_dict('records') slower here
+        metadata = [
+            dict(zip(columns, values))
+            for values in zip(*(df[col].tolist() for col in columns))
+        ]
+
+        # Drop missing cells, touching only the rows that have any
+        present = df[columns].notna().to_numpy()
+        for i in (~present.all(axis=1)).nonzero()[0]:
+            meta = metadata[i]
+            for col, ok in zip(columns, present[i]):
+                if not ok:
+                    del meta[col]
 
-        # Parse genres using config
-        genres = self._parse_genres(row['genres'])
+        return metadata
 
-        # Normalize rating using config
-        rating = self._normalize_rating(row['rating'])
+    def _create_movies(self, df: pd.DataFrame) -> List[Movie]:
+        """
+        Convert a preprocessed DataFrame to Movie objects.
 
-        return Movie(
-            movie_id=int(row['movie_id']),
-            title=str(row['title']),
+        Each column is pulled out of the DataFrame once and the columns
+        are zipped together, instead of materializing a Series per row.
+
+        Args:
+            df: Preprocessed DataFrame (with standardized column names)
+
+        Returns:
+            List of Movie objects
+        """
+        columns = zip(
+            df['movie_id'].tolist(),
+            df['title'].tolist(),
+            df['genres'].tolist(),
+            df['overview'].tolist(),
+            df['language'].tolist(),
+            df['rating'].tolist(),
+            self._extract_metadata(df)
+        )
+
+        # Preprocessing guarantees every field's type (positive int IDs,
+        # filled strings, parsed genre lists, float ratings), so
+        # construction cannot fail and needs no per-row exception handling.
+        # Positional in field order: id, title, genres, overview,
+        # language, rating, metadata
+        return [
+            Movie(int(movie_id), str(title), genres, str(overview), str(language), rating, metadata)
+            for movie_id, title, genres, overview, language, rating, metadata in columns
+        ]
+
+    def _create_table(self, df: pd.DataFrame) -> MovieTable:
+        """
+        Convert a preprocessed DataFrame to a MovieTable.
+
+        Applies the same normalization as Movie.__post_init__, column-wise.
+
+        Args:
+            df: Preprocessed DataFrame (with standardized column names)
+
+        Returns:
+            MovieTable with one row per movie
+        """
+        language = df['language'].astype(str).str.lower()
+        language = language.mask(language == '', 'unknown')
+        # One shared string per language code
+        language = np.array([sys.intern(code) for code in language.tolist()], dtype=object)
+
+        rating = df['rating'].to_numpy(dtype=np.float64)
+        rating = np.where((rating < 0) | (rating > 10), 0.0, rating).astype(np.float32)
+
+        genres = [
+            [g.strip() for g in genre_list.split(',') if g.strip()]
+            if isinstance(genre_list, str) else genre_list
+            for genre_list in df['genres'].tolist()
+        ]
+
+        # Genres as integer codes into a sorted vocabulary, CSR-style:
+        # row i's codes are genre_codes[genre_indptr[i]:genre_indptr[i + 1]]
+        genre_vocab = sorted({g for genre_list in genres for g in genre_list})
+        code = {g: i for i, g in enumerate(genre_vocab)}
+        genre_indptr = np.zeros(len(genres) + 1, dtype=np.int64)
+        np.cumsum([len(genre_list) for genre_list in genres], out=genre_indptr[1:])
+        genre_codes = np.fromiter(
+            (code[g] for genre_list in genres for g in genre_list),
+            dtype=np.int32, count=int(genre_indptr[-1])
+        )
+
+        return MovieTable(
+            movie_id=df['movie_id'].to_numpy(dtype=np.int64),
+            title=df['title'].astype(str).to_numpy(dtype=object),
             genres=genres,
-            overview=str(row['overview']),
-            language=str(row['language']),
+            overview=df['overview'].astype(str).to_numpy(dtype=object),
+            language=language,
             rating=rating,
-            metadata=metadata
+            metadata=self._extract_metadata(df),
+            genre_vocab=genre_vocab,
+            genre_codes=genre_codes,
+            genre_indptr=genre_indptr
         )
 
-    def load(self) -> List[Movie]:
+    def _read_header(self) -> pd.DataFrame:
         """
-        Load and process the movie dataset.
+        Read the CSV header, resolve the config and validate the schema.
 
         Returns:
-            List of Movie objects
+            Empty DataFrame with the CSV's column names
         """
-        logger.info(f"Loading data from {self.data_path}")
+        logger.info(f"Loading data from {self.data_path or 'buffer'}")
 
-        # Load CSV
-        df = pd.read_csv(self.data_path)
-        logger.info(f"Loaded {len(df)} raw records")
+        # Read the header only; detection and validation need no rows
+        if self._is_parquet:
+            header = pq.read_schema(self.data_path).empty_table().to_pandas()
+        else:
+            header = pd.read_csv(self._source(), nrows=0)
 
         # Auto-detect config if not provided
         if self.config is None:
             logger.info("No config provided, attempting auto-detection...")
-            self.config = auto_detect_config(df)
+            self.config = auto_detect_config(header)
 
         # Validate schema (before mapping)
-        self._validate_schema(df)
+        self._validate_schema(header)
+        return header
 
-        # Preprocess (includes column mapping)
-        df = self._preprocess_dataframe(df)
-        
-        # Convert to Movie objects
+    def load(self) -> List[Movie]:
+        """
+        Load and process the movie dataset.
+
+        Returns:
+            List of Movie objects
+        """
+        header = self._read_header()
+
+        # Load CSV (mapped columns only), then preprocess (includes column
+        # mapping) and convert each chunk to Movie objects
         movies = []
-        for _, row in df.iterrows():
-            try:
-                movie = self._create_movie_object(row)
-                movies.append(movie)
-            except Exception as e:
-                logger.warning(f"Failed to create movie from row: {e}")
-                continue
+        for df in self._preprocessed_frames(header):
+            movies.extend(self._create_movies(df))
         
         logger.info(f"✓ Successfully created {len(movies)} Movie objects")
         return movies
 
+    def load_table(self) -> MovieTable:
+        """
+        Load and process the movie dataset into column arrays.
+
+        Same data as load(), without building a Movie object per row.
+
+        Returns:
+            MovieTable with one row per movie
+        """
+        header = self._read_header()
+
+        chunks = list(self._preprocessed_frames(header))
+        df = chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+        table = self._create_table(df)
+
+        logger.info(f"✓ Successfully created MovieTable with {len(table)} movies")
+        return table
+
+
+def _preprocess_chunk(loader: MovieDataLoader, chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Preprocess one raw CSV chunk in a worker process.
+
+    Module-level so ProcessPoolExecutor can pickle it.
+
+    Args:
+        loader: Loader whose config drives preprocessing
+        chunk: Raw DataFrame chunk
+
+    Returns:
+        Preprocessed chunk
+    """
+    return loader._preprocess_dataframe(chunk)
+
 
 def create_sample_dataset(output_path: str = 'data/movies.csv') -> None:
     """
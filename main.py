@@ -8,9 +8,15 @@ Responsibilities:
 This is the entry point for the recommendation system.
 """
 import logging
-from typing import List, Dict, Optional
+from bisect import bisect_right
+from typing import List, Dict, Iterator, Optional, Tuple
 from pathlib import Path
 
+try:
+    from rapidfuzz import fuzz, process as fuzz_process
+except ImportError:  # optional: fall back to substring matching only
+    fuzz = fuzz_process = None
+
 from models.movie import Movie
 from ingestion.loader import MovieDataLoader
 from features.feature_builder import FeatureBuilder
@@ -23,6 +29,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Neighbours precomputed per movie; covers top_k up to 25 with the
+# 2x candidate over-fetch used for preference re-ranking
+TOP_K_NEIGHBOURS = 50
+
+# Minimum rapidfuzz WRatio (0-100) accepted as a fuzzy title match
+FUZZY_SCORE_CUTOFF = 75
+
+# Joins the lowercased titles into one searchable string; cannot occur
+# in a title read from CSV
+_TITLE_SEPARATOR = '\0'
+
 
 class MovieRecommender:
     """
@@ -53,6 +70,12 @@ class MovieRecommender:
 
         # Components
         self.movies: List[Movie] = []
+        self._titles: Tuple[str, ...] = ()
+        self._titles_lower: Tuple[str, ...] = ()
+        self._title_blob = ''
+        self._title_starts: List[int] = [1]
+        self._title_index: Dict[str, Movie] = {}
+        self._id_index: Dict[int, Movie] = {}
         self.feature_builder: Optional[FeatureBuilder] = None
         self.similarity_engine: Optional[SimilarityEngine] = None
         self.preference_engine: Optional[PreferenceEngine] = None
@@ -73,22 +96,62 @@ class MovieRecommender:
 
         # Step 1: Load data
         logger.info("\n[1/4] Loading movie data...")
-        loader = MovieDataLoader(self.data_path, config=self.config)
+        loader = MovieDataLoader(
+            self.data_path,
+            config=self.config,
+            cache_path=str(self.cache_dir / 'movies.parquet')
+        )
         self.movies = loader.load()
+        self._titles = tuple(movie.title for movie in self.movies)
+        self._titles_lower = tuple(title.lower() for title in self._titles)
+        
+        # All lowercased titles in one string: a substring search is one
+        # C-level str.find, mapped back to a title by its start offset
+        # (the last entry is a sentinel past the end)
+        self._title_blob = _TITLE_SEPARATOR.join(self._titles_lower)
+        self._title_starts = [0]
+        for title_lower in self._titles_lower:
+            self._title_starts.append(self._title_starts[-1] + len(title_lower) + 1)
+        
+        # Lookup indexes; the first movie with a given title wins, as in
+        # a scan in dataset order
+        self._title_index = {}
+        for movie in self.movies:
+            self._title_index.setdefault(movie.title.lower(), movie)
+        self._id_index = {movie.movie_id: movie for movie in self.movies}
         
         # Step 2: Build features
         logger.info("\n[2/4] Building features...")
         self.feature_builder = FeatureBuilder()
         
-        cache_exists = (self.cache_dir / 'mappings.pkl').exists()
+        # The cached matrix and top-k table are only valid for the data
+        # file (and config) they were built from, not just the same IDs
+        fingerprint = loader.fingerprint()
+        fingerprint_path = self.cache_dir / 'fingerprint.txt'
+        cache_exists = (self.cache_dir / 'mappings.npz').exists() and fingerprint_path.exists()
+        cache_matches = False
         
         if not rebuild and cache_exists:
+            cache_matches = fingerprint_path.read_text().strip() == fingerprint
+        
+        if cache_matches:
             logger.info("Loading cached features...")
-            self.feature_builder.load(str(self.cache_dir))
-            # Still need to rebuild the actual matrix
-            feature_matrix = self.feature_builder.build_features(self.movies)
+            # The feature matrix is memory-mapped read-only, so worker
+            # processes share the cached pages
+            self.feature_builder.load(str(self.cache_dir), mmap_mode='r')
+            cache_matches = self.feature_builder.feature_matrix is not None
+        
+        if cache_matches:
+            # Reuse the saved matrix instead of re-deriving it
+            feature_matrix = self.feature_builder.feature_matrix
         else:
-            logger.info("Building features from scratch...")
+            if cache_exists and not rebuild:
+                logger.info("Cached features are for different data; rebuilding...")
+            else:
+                logger.info("Building features from scratch...")
+            # Invalidate first so an interrupted rebuild is never reused
+            fingerprint_path.unlink(missing_ok=True)
+            self.feature_builder = FeatureBuilder()
             feature_matrix = self.feature_builder.build_features(self.movies)
             self.feature_builder.save(str(self.cache_dir))
         
@@ -96,6 +159,18 @@ class MovieRecommender:
         logger.info("\n[3/4] Initializing similarity engine...")
         self.similarity_engine = SimilarityEngine(feature_matrix)
         
+        top_k_path = self.cache_dir / 'topk.npy'
+        top_k_cached = cache_matches and self.similarity_engine.load_top_k(
+            str(top_k_path), mmap_mode='r', k=TOP_K_NEIGHBOURS
+        )
+        if not top_k_cached:
+            self.similarity_engine.precompute_top_k(TOP_K_NEIGHBOURS)
+            if self.similarity_engine.top_k_indices is not None:
+                self.similarity_engine.save_top_k(str(top_k_path))
+        
+        if not cache_matches:
+            fingerprint_path.write_text(fingerprint)
+        
         # Step 4: Initialize preference engine
         logger.info("\n[4/4] Initializing preference engine...")
         self.preference_engine = PreferenceEngine(self.movies)
@@ -108,6 +183,10 @@ class MovieRecommender:
         """
         Find a movie by title.
         
+        Fuzzy matching tries a case-insensitive substring match first and,
+        when rapidfuzz is installed, falls back to the best WRatio match
+        so that typos still resolve to a movie.
+        
         Args:
             title: Movie title to search for
             fuzzy: Whether to use fuzzy matching
@@ -118,18 +197,75 @@ class MovieRecommender:
         title_lower = title.lower()
         
         # Exact match first
-        for movie in self.movies:
-            if movie.title.lower() == title_lower:
-                return movie
+        movie = self._title_index.get(title_lower)
+        if movie is not None:
+            return movie
         
         # Fuzzy match
         if fuzzy:
-            for movie in self.movies:
-                if title_lower in movie.title.lower():
-                    return movie
+            for index in self._titles_containing(title_lower):
+                return self.movies[index]
+            
+            if fuzz_process is not None:
+                # Titles are lowercased once at load, not on every search
+                match = fuzz_process.extractOne(
+                    title_lower,
+                    self._titles_lower,
+                    scorer=fuzz.WRatio,
+                    score_cutoff=FUZZY_SCORE_CUTOFF
+                )
+                if match is not None:
+                    return self.movies[match[2]]
         
         return None
     
+    def search_titles(self, query: str, top_n: int = 50) -> List[str]:
+        """
+        Find titles matching a search query.
+        
+        Exact (case-insensitive) matches come first, followed by titles
+        containing the query, in dataset order.
+        
+        Args:
+            query: Search text
+            top_n: Maximum number of titles to return
+            
+        Returns:
+            List of matching movie titles
+        """
+        query_lower = query.lower()
+        exact = []
+        partial = []
+        
+        for index in self._titles_containing(query_lower):
+            if self._titles_lower[index] == query_lower:
+                exact.append(self._titles[index])
+            elif len(partial) < top_n:
+                partial.append(self._titles[index])
+        
+        return (exact + partial)[:top_n]
+    
+    def _titles_containing(self, query_lower: str) -> Iterator[int]:
+        """
+        Indices of titles containing a lowercased query, in dataset order.
+        
+        Args:
+            query_lower: Lowercased search text
+            
+        Returns:
+            Iterator over matching title indices
+        """
+        if not self._titles_lower or _TITLE_SEPARATOR in query_lower:
+            return
+        
+        blob, starts = self._title_blob, self._title_starts
+        position = blob.find(query_lower)
+        while position != -1:
+            index = bisect_right(starts, position) - 1
+            yield index
+            # Resume at the next title
+            position = blob.find(query_lower, starts[index + 1])
+    
     def get_recommendations(
         self,
         movie_title: str,
@@ -162,10 +298,10 @@ class MovieRecommender:
             logger.error(f"Movie ID {query_movie.movie_id} not in feature index")
             return []
         
-        # Find similar movies
+        # Find similar movies (preferences re-rank a larger candidate pool)
         similar_indices = self.similarity_engine.find_similar_items(
             query_idx,
-            top_k=top_k * 2  # Get more candidates for preference filtering
+            top_k=top_k * 2 if preferences else top_k
         )
         
         # Convert to movie IDs
@@ -184,19 +320,7 @@ class MovieRecommender:
             )
         else:
             # No preferences - just return top candidates
-            results = []
-            for movie_id, score in candidates[:top_k]:
-                movie = next(m for m in self.movies if m.movie_id == movie_id)
-                results.append({
-                    'movie_id': movie_id,
-                    'title': movie.title,
-                    'genres': movie.genres,
-                    'language': movie.language,
-                    'rating': movie.rating,
-                    'overview': movie.overview,
-                    'score': score,
-                    'metadata': movie.metadata
-                })
+            results = self.preference_engine.enrich(candidates)
         
         return results
     
@@ -217,7 +341,7 @@ class MovieRecommender:
         Returns:
             List of recommendations
         """
-        movie = next((m for m in self.movies if m.movie_id == movie_id), None)
+        movie = self._id_index.get(movie_id)
         if not movie:
             logger.error(f"Movie ID {movie_id} not found")
             return []
@@ -228,6 +352,11 @@ class MovieRecommender:
         """Get all available movies."""
         return self.movies
     
+    @property
+    def titles(self) -> Tuple[str, ...]:
+        """All movie titles, in dataset order."""
+        return self._titles
+    
     def get_available_genres(self) -> List[str]:
         """Get list of all unique genres in the dataset."""
         all_genres = set()
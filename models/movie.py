@@ -2,16 +2,21 @@
 Movie data model - Canonical schema for the recommendation system.
 All ML logic operates on Movie objects, not raw DataFrames.
 """
+import sys
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional
 
+import numpy as np
 
-@dataclass
+
+@dataclass(slots=True)
 class Movie:
     """
     Canonical representation of a movie entity.
     
     This schema ensures type safety and consistency across the pipeline.
+    Instances use __slots__ (no per-instance __dict__), which keeps large
+    catalogues compact. Requires Python 3.10+.
     """
     movie_id: int
     title: str
@@ -27,8 +32,8 @@ class Movie:
         if isinstance(self.genres, str):
             self.genres = [g.strip() for g in self.genres.split(',') if g.strip()]
         
-        # Normalize language code
-        self.language = self.language.lower() if self.language else 'unknown'
+        # Normalize language code (interned: one shared string per code)
+        self.language = sys.intern(self.language.lower()) if self.language else 'unknown'
         
         # Ensure rating is within bounds
         if self.rating < 0 or self.rating > 10:
@@ -48,3 +53,29 @@ class Movie:
             'rating': self.rating,
             'metadata': self.metadata
         }
+
+
+@dataclass
+class MovieTable:
+    """
+    Column-oriented (struct-of-arrays) representation of a movie corpus.
+    
+    Row i of every column describes the same movie. Values follow the
+    same normalization rules as Movie, so a table and the equivalent
+    list of Movie objects carry the same data. Genres are also stored
+    as integer codes into genre_vocab, with row i's codes at
+    genre_codes[genre_indptr[i]:genre_indptr[i + 1]].
+    """
+    movie_id: np.ndarray          # int64
+    title: np.ndarray             # object (str)
+    genres: List[List[str]]
+    overview: np.ndarray          # object (str)
+    language: np.ndarray          # object (str)
+    rating: np.ndarray            # float32
+    metadata: List[Dict[str, Any]]
+    genre_vocab: List[str]        # sorted distinct genre names
+    genre_codes: np.ndarray       # int32 indices into genre_vocab
+    genre_indptr: np.ndarray      # int64 row offsets into genre_codes
+    
+    def __len__(self) -> int:
+        return len(self.movie_id)
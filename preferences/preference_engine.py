@@ -10,12 +10,67 @@ This is what makes the system personalized and production-like.
 from typing import List, Tuple, Dict, Optional
 import logging
 
+import numpy as np
+
 from models.movie import Movie
 
+try:
+    from numba import njit  # JIT-compiles the candidate scoring kernel
+except ImportError:  # optional: fall back to the per-movie Python path
+    njit = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _popcount64(x):
+    """Count set bits in a uint64 (SWAR: no per-bit loop)."""
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+def _score_kernel(
+    rows, base_scores, ratings, languages, genre_bits,
+    preferred_language_mask, preferred_genre_bits, n_preferred_genres,
+    genre_weight, language_weight, min_rating
+):
+    """
+    Adjusted score for every candidate row.
+    
+    Same arithmetic, in the same order, as
+    PreferenceEngine._score_vectorized, one candidate at a time.
+    """
+    adjusted = np.empty(len(rows), dtype=np.float64)
+    for j in range(len(rows)):
+        row = rows[j]
+        
+        genre_boost = 0.0
+        if n_preferred_genres > 0:
+            overlap = 0
+            for w in range(genre_bits.shape[1]):
+                overlap += _popcount64(genre_bits[row, w] & preferred_genre_bits[w])
+            genre_boost = overlap / n_preferred_genres * genre_weight
+        
+        language_boost = language_weight if preferred_language_mask[languages[row]] else 0.0
+        
+        rating_penalty = 1.0
+        rating = ratings[row]
+        if rating < min_rating:
+            ratio = rating / min_rating if min_rating > 0 else 1.0
+            rating_penalty = max(0.5, ratio)
+        
+        adjusted[j] = (base_scores[j] + genre_boost + language_boost) * rating_penalty
+    return adjusted
+
+
+if njit is not None:
+    # No fastmath: results must match the Python path bit for bit
+    _popcount64 = njit(cache=True)(_popcount64)
+    _score_kernel = njit(cache=True)(_score_kernel)
+
+
 class UserPreferences:
     """
     Encapsulates user preferences for personalization.
@@ -45,6 +100,34 @@ class UserPreferences:
         self.language_weight = language_weight
         self.min_rating = min_rating
     
+    def genre_bits(self, engine: 'PreferenceEngine') -> int:
+        """
+        Encode the preferred genres as a bitmask over engine's genre ids.
+        
+        Genres the engine has never seen cannot match and are left out.
+        
+        Args:
+            engine: PreferenceEngine whose genre ids to use
+            
+        Returns:
+            Integer bitmask (bit i set = genre id i preferred)
+        """
+        return engine.encode_genres(self.preferred_genres)
+    
+    def is_neutral(self) -> bool:
+        """
+        Whether these preferences leave every score unchanged.
+        
+        Returns:
+            True if no genres or languages are preferred and there is no
+            minimum rating
+        """
+        return (
+            not self.preferred_genres
+            and not self.preferred_languages
+            and self.min_rating <= 0
+        )
+    
     def __repr__(self) -> str:
         return (
             f"UserPreferences(genres={list(self.preferred_genres)}, "
@@ -66,81 +149,169 @@ class PreferenceEngine:
             movies: List of all Movie objects (for metadata lookup)
         """
         self.movies_by_id = {movie.movie_id: movie for movie in movies}
+        self._build_columns(movies)
         logger.info(f"Preference engine initialized with {len(movies)} movies")
     
-    def _compute_genre_boost(
-        self,
-        movie: Movie,
-        preferences: UserPreferences
-    ) -> float:
+    def _build_columns(self, movies: List[Movie]) -> None:
+        """
+        Build per-movie column arrays for the scoring kernel.
+        
+        Row i describes movies[i]: rating, language id and a bitmask
+        over genre ids (64 genres per uint64 word).
+        
+        Args:
+            movies: List of all Movie objects
         """
-        Compute boost factor based on genre overlap.
+        # Later duplicates win, as in movies_by_id
+        self._row_by_id = {movie.movie_id: row for row, movie in enumerate(movies)}
+        self._ratings = np.array([movie.rating for movie in movies], dtype=np.float64)
+        
+        self._language_ids: Dict[str, int] = {}
+        self._movie_languages = np.array(
+            [self._language_ids.setdefault(movie.language, len(self._language_ids)) for movie in movies],
+            dtype=np.int32
+        )
+        
+        # Genre sets as integer bitmasks: overlap is the popcount of a & b
+        self._genre_ids: Dict[str, int] = {}
+        genre_masks = [
+            sum(1 << self._genre_ids.setdefault(genre, len(self._genre_ids)) for genre in set(movie.genres))
+            for movie in movies
+        ]
+        
+        # The same masks as uint64 words (64 genre ids per word) for the kernel
+        self._n_genre_words = max(1, (len(self._genre_ids) + 63) // 64)
+        self._movie_genre_bits = self._to_words(genre_masks).reshape(len(movies), self._n_genre_words)
+    
+    def _to_words(self, masks: List[int]) -> np.ndarray:
+        """
+        Split integer genre bitmasks into little-endian uint64 words.
         
         Args:
-            movie: Movie to evaluate
-            preferences: User preferences
+            masks: Bitmasks from encode_genres
             
         Returns:
-            Boost factor (0 to 1)
+            Flat uint64 array, _n_genre_words words per mask
         """
-        if not preferences.preferred_genres:
-            return 0.0
-        
-        # Calculate genre overlap
-        movie_genres = set(movie.genres)
-        overlap = len(movie_genres & preferences.preferred_genres)
-        max_possible = len(preferences.preferred_genres)
+        n_bytes = 8 * self._n_genre_words
+        packed = b''.join(mask.to_bytes(n_bytes, 'little') for mask in masks)
+        return np.frombuffer(packed, dtype='<u8').astype(np.uint64)
+    
+    def encode_genres(self, genres) -> int:
+        """
+        Encode genre names as a bitmask over this engine's genre ids.
         
-        # Normalize to 0-1
-        genre_match_score = overlap / max_possible if max_possible > 0 else 0.0
+        Args:
+            genres: Iterable of genre names
+            
+        Returns:
+            Integer bitmask; unknown genres are ignored
+        """
+        genre_ids = self._genre_ids
+        return sum(1 << genre_ids[genre] for genre in set(genres) if genre in genre_ids)
+    
+    def _gather_candidates(
+        self,
+        candidates: List[Tuple[int, float]]
+    ) -> Tuple[List[int], np.ndarray, np.ndarray]:
+        """
+        Resolve candidate movie IDs to engine rows.
         
-        return genre_match_score * preferences.genre_weight
+        Args:
+            candidates: List of (movie_id, score) tuples
+            
+        Returns:
+            Tuple of (movie_ids, rows, base_scores) for the known movies
+        """
+        movie_ids, rows, base_scores = [], [], []
+        for movie_id, base_score in candidates:
+            row = self._row_by_id.get(movie_id)
+            if row is None:
+                logger.warning(f"Movie ID {movie_id} not found, skipping")
+                continue
+            movie_ids.append(movie_id)
+            rows.append(row)
+            base_scores.append(base_score)
+        return movie_ids, np.array(rows, dtype=np.intp), np.array(base_scores, dtype=np.float64)
     
-    def _compute_language_boost(
+    def _preferred_language_mask(self, preferences: UserPreferences) -> np.ndarray:
+        """Boolean mask over language ids: True for preferred languages."""
+        mask = np.zeros(len(self._language_ids) + 1, dtype=np.bool_)
+        for language in preferences.preferred_languages:
+            if language in self._language_ids:
+                mask[self._language_ids[language]] = True
+        return mask
+    
+    def _score_with_kernel(
         self,
-        movie: Movie,
+        rows: np.ndarray,
+        base_scores: np.ndarray,
         preferences: UserPreferences
-    ) -> float:
+    ) -> np.ndarray:
         """
-        Compute boost factor based on language match.
+        Adjusted scores for candidate rows via the JIT-compiled kernel.
         
         Args:
-            movie: Movie to evaluate
-            preferences: User preferences
+            rows: Engine rows of the candidates
+            base_scores: Similarity scores of the candidates
+            preferences: User preferences to apply
             
         Returns:
-            Boost factor (0 or language_weight)
+            float64 array of adjusted scores, aligned with rows
         """
-        if not preferences.preferred_languages:
-            return 0.0
-        
-        if movie.language in preferences.preferred_languages:
-            return preferences.language_weight
-        
-        return 0.0
+        return _score_kernel(
+            rows, base_scores,
+            self._ratings, self._movie_languages, self._movie_genre_bits,
+            self._preferred_language_mask(preferences),
+            self._to_words([preferences.genre_bits(self)]),
+            len(preferences.preferred_genres),
+            float(preferences.genre_weight), float(preferences.language_weight),
+            float(preferences.min_rating)
+        )
     
-    def _compute_rating_penalty(
+    def _score_vectorized(
         self,
-        movie: Movie,
+        rows: np.ndarray,
+        base_scores: np.ndarray,
         preferences: UserPreferences
-    ) -> float:
+    ) -> np.ndarray:
         """
-        Compute penalty for low-rated movies (soft filter).
+        Adjusted scores for candidate rows with whole-array NumPy operations.
+        
+        The adjusted score is (score + genre_boost + language_boost) *
+        rating_penalty: genre overlap as a fraction of the preferred
+        genres times genre_weight, language_weight for a preferred
+        language, and a soft penalty (at most 50%) below min_rating.
         
         Args:
-            movie: Movie to evaluate
-            preferences: User preferences
+            rows: Engine rows of the candidates
+            base_scores: Similarity scores of the candidates
+            preferences: User preferences to apply
             
         Returns:
-            Penalty factor (0 to 1, where 1 = no penalty)
+            float64 array of adjusted scores, aligned with rows
         """
-        if movie.rating >= preferences.min_rating:
-            return 1.0
+        genre_boost = 0.0
+        if preferences.preferred_genres:
+            preferred_words = self._to_words([preferences.genre_bits(self)])
+            shared = self._movie_genre_bits[rows] & preferred_words
+            if hasattr(np, 'bitwise_count'):  # NumPy 2.0+
+                overlap = np.bitwise_count(shared).sum(axis=1)
+            else:
+                overlap = np.unpackbits(shared.view(np.uint8), axis=1).sum(axis=1)
+            genre_boost = overlap / len(preferences.preferred_genres) * preferences.genre_weight
+        
+        language_boost = 0.0
+        if preferences.preferred_languages:
+            is_preferred = self._preferred_language_mask(preferences)[self._movie_languages[rows]]
+            language_boost = np.where(is_preferred, preferences.language_weight, 0.0)
+        
+        ratings = self._ratings[rows]
+        min_rating = preferences.min_rating
+        ratio = ratings / min_rating if min_rating > 0 else np.ones_like(ratings)
+        rating_penalty = np.where(ratings >= min_rating, 1.0, np.maximum(0.5, ratio))
         
-        # Soft penalty for movies below min rating
-        # Still allows them but reduces their score
-        ratio = movie.rating / preferences.min_rating if preferences.min_rating > 0 else 1.0
-        return max(0.5, ratio)  # Minimum 50% penalty
+        return (base_scores + genre_boost + language_boost) * rating_penalty
     
     def apply_preferences(
         self,
@@ -161,35 +332,26 @@ class PreferenceEngine:
         """
         logger.info("Applying user preferences...")
         
-        adjusted_candidates = []
+        movie_ids, rows, base_scores = self._gather_candidates(candidates)
         
-        for movie_id, base_score in candidates:
-            # Get movie metadata
-            movie = self.movies_by_id.get(movie_id)
-            if not movie:
-                logger.warning(f"Movie ID {movie_id} not found, skipping")
-                continue
-            
-            # Compute boosts
-            genre_boost = self._compute_genre_boost(movie, preferences)
-            language_boost = self._compute_language_boost(movie, preferences)
-            rating_penalty = self._compute_rating_penalty(movie, preferences)
-            
-            # Combine: base score + boosts, then apply penalty
-            adjusted_score = (base_score + genre_boost + language_boost) * rating_penalty
-            
-            adjusted_candidates.append((movie_id, adjusted_score))
+        # Score every candidate at once
+        if preferences.is_neutral():
+            # Nothing to boost or penalize: scores pass through unchanged
+            adjusted = base_scores
+        elif njit is not None:
+            adjusted = self._score_with_kernel(rows, base_scores, preferences)
+        else:
+            adjusted = self._score_vectorized(rows, base_scores, preferences)
         
-        # Sort by adjusted score
-        adjusted_candidates.sort(key=lambda x: x[1], reverse=True)
+        # Sort by adjusted score (stable: ties keep candidate order)
+        order = np.argsort(-adjusted, kind='stable')
+        adjusted = adjusted[order]
         
         # Optional normalization
-        if normalize and adjusted_candidates:
-            max_score = max(score for _, score in adjusted_candidates)
-            if max_score > 0:
-                adjusted_candidates = [
-                    (mid, score / max_score) for mid, score in adjusted_candidates
-                ]
+        if normalize and len(adjusted) and adjusted[0] > 0:
+            adjusted = adjusted / adjusted[0]
+        
+        adjusted_candidates = list(zip([movie_ids[i] for i in order.tolist()], adjusted.tolist()))
         
         logger.info(f"✓ Re-ranked {len(adjusted_candidates)} candidates")
         return adjusted_candidates
@@ -215,13 +377,21 @@ class PreferenceEngine:
         ranked = self.apply_preferences(candidates, preferences)
         
         # Take top-k
-        top_results = ranked[:top_k]
+        return self.enrich(ranked[:top_k])
+    
+    def enrich(self, ranked: List[Tuple[int, float]]) -> List[Dict]:
+        """
+        Attach movie info to ranked (movie_id, score) pairs.
         
-        # Enrich with metadata
-        enriched_results = []
-        for movie_id, score in top_results:
-            movie = self.movies_by_id[movie_id]
-            enriched_results.append({
+        Args:
+            ranked: List of (movie_id, score) tuples
+            
+        Returns:
+            List of dicts with movie info and scores
+        """
+        movies_by_id = self.movies_by_id
+        return [
+            {
                 'movie_id': movie_id,
                 'title': movie.title,
                 'genres': movie.genres,
@@ -230,9 +400,10 @@ class PreferenceEngine:
                 'overview': movie.overview,
                 'score': score,
                 'metadata': movie.metadata
-            })
-        
-        return enriched_results
+            }
+            for movie_id, score in ranked
+            for movie in (movies_by_id[movie_id],)
+        ]
 
 
 if __name__ == "__main__":
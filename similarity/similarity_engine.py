@@ -7,14 +7,34 @@ Responsibilities:
 
 This layer is agnostic to what the vectors represent.
 """
+import joblib
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from typing import List, Tuple
+from scipy.linalg.blas import sgemv
+from scipy.sparse import spmatrix
+from sklearn.metrics.pairwise import linear_kernel
+from sklearn.preprocessing import normalize
+from sklearn.utils.extmath import row_norms
+from typing import List, Optional, Tuple, Union
 import logging
+import os
+from pathlib import Path
+
+try:
+    import faiss  # exact / approximate nearest-neighbour indexes
+except ImportError:  # optional: brute-force scoring only
+    faiss = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Smallest batch shard worth handing to a separate thread
+_MIN_QUERIES_PER_SHARD = 8
+
+# HNSW graph parameters: links per node, build and search beam widths
+_HNSW_M = 32
+_HNSW_EF_CONSTRUCTION = 200
+_HNSW_EF_SEARCH = 128
+
 
 class SimilarityEngine:
     """
@@ -22,28 +42,308 @@ class SimilarityEngine:
     Domain-agnostic: only knows about vectors and scores.
     """
     
-    def __init__(self, feature_matrix: np.ndarray):
+    def __init__(
+        self,
+        feature_matrix: Union[np.ndarray, spmatrix],
+        full_matrix_max_items: int = 5000,
+        n_jobs: Optional[int] = None,
+        index_type: str = 'brute',
+        cache_dtype: type = np.float32
+    ):
         """
         Initialize the similarity engine.
         
         Args:
-            feature_matrix: Pre-computed feature matrix (n_items, n_features)
+            feature_matrix: Pre-computed dense or sparse feature matrix
+                (n_items, n_features)
+            full_matrix_max_items: Catalogues up to this size keep the full
+                similarity matrix once computed, so repeat queries are a row
+                lookup (n_items^2 float32 values: ~100 MB at 5000 items)
+            n_jobs: Threads scoring shards of a batch query in parallel
+                (None uses all cores)
+            index_type: 'brute' scores every item; with faiss installed,
+                'flat_ip' (exact) or 'hnsw' (approximate, sublinear) answer
+                queries from a faiss index over the densified normalized rows
+            cache_dtype: dtype the kept full similarity matrix is stored in;
+                np.float16 halves its memory at ~1e-3 score precision (so
+                near-tied neighbours may swap places)
         """
         self.feature_matrix = feature_matrix
         self.n_items = feature_matrix.shape[0]
+        self.full_matrix_max_items = full_matrix_max_items
+        self.n_jobs = n_jobs
+        self.cache_dtype = np.dtype(cache_dtype)
+        
+        # Row-normalized float32 matrix: cosine similarity becomes a linear
+        # kernel, and scoring moves half the bytes of float64. Matrices that
+        # are already unit-length float32 (e.g. FeatureBuilder output) are
+        # used as-is instead of being copied. Sparse input is kept as CSR,
+        # whose row slices the scoring paths rely on.
+        normed = self._l2_normalize(feature_matrix)
+        if isinstance(normed, np.ndarray):
+            self._normed = np.ascontiguousarray(normed, dtype=np.float32)
+        else:
+            self._normed = normed.tocsr().astype(np.float32, copy=False)
+        
+        # Full similarity matrix, computed lazily for small catalogues
+        self._similarity_cache: Optional[np.ndarray] = None
+        
+        # Optional faiss index (inner product on unit rows = cosine)
+        self._index = self._build_index(index_type)
+        
+        # Optional precomputed top-k neighbours (see precompute_top_k)
+        self.top_k_indices: Optional[np.ndarray] = None
+        self.top_k_scores: Optional[np.ndarray] = None
+        
         logger.info(f"Similarity engine initialized with {self.n_items} items")
     
+    @staticmethod
+    def _l2_normalize(
+        feature_matrix: Union[np.ndarray, spmatrix]
+    ) -> Union[np.ndarray, spmatrix]:
+        """
+        Return an L2 row-normalized view of the feature matrix.
+        
+        Args:
+            feature_matrix: Dense or sparse feature matrix
+            
+        Returns:
+            The input itself if its non-zero rows are already unit-length,
+            otherwise a normalized copy
+        """
+        norms = row_norms(feature_matrix)
+        if np.allclose(norms[norms > 0], 1.0, atol=1e-4):
+            return feature_matrix
+        return normalize(feature_matrix, norm='l2')
+    
+    def _build_index(self, index_type: str):
+        """
+        Build the faiss index requested by index_type.
+        
+        Args:
+            index_type: 'brute', 'flat_ip' or 'hnsw'
+            
+        Returns:
+            faiss index over the normalized rows, or None for brute force
+        """
+        if index_type not in ('brute', 'flat_ip', 'hnsw'):
+            raise ValueError(f"Unknown index_type '{index_type}'")
+        if index_type == 'brute':
+            return None
+        if faiss is None:
+            logger.warning(f"faiss not installed; using brute force instead of '{index_type}'")
+            return None
+        
+        vectors = self._normed if isinstance(self._normed, np.ndarray) else self._normed.toarray()
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        
+        if index_type == 'hnsw':
+            index = faiss.IndexHNSWFlat(vectors.shape[1], _HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = _HNSW_EF_CONSTRUCTION
+            index.hnsw.efSearch = _HNSW_EF_SEARCH
+        else:
+            index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+        
+        logger.info(f"✓ Built faiss {index_type} index over {index.ntotal} items")
+        return index
+    
+    def _search_index(
+        self,
+        rows: np.ndarray,
+        top_k: int,
+        exclude_self: bool
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Answer queries from the faiss index.
+        
+        Args:
+            rows: Query item indices
+            top_k: Number of similar items per query
+            exclude_self: Whether to exclude each query item itself
+            
+        Returns:
+            List of results, one per query
+        """
+        k = min(top_k + 1 if exclude_self else top_k, self.n_items)
+        if k <= 0:
+            return [[] for _ in rows]
+        
+        queries = self._normed[rows]
+        if not isinstance(queries, np.ndarray):
+            queries = queries.toarray()
+        scores, neighbours = self._index.search(np.ascontiguousarray(queries, dtype=np.float32), k)
+        
+        results = []
+        for query_idx, row_scores, row_neighbours in zip(rows.tolist(), scores, neighbours):
+            # faiss pads missing neighbours with -1
+            keep = row_neighbours >= 0
+            if exclude_self:
+                keep &= row_neighbours != query_idx
+            results.append(list(zip(
+                row_neighbours[keep][:top_k].tolist(),
+                row_scores[keep][:top_k].tolist()
+            )))
+        return results
+    
+    @staticmethod
+    def select_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """
+        Indices of the k highest scores, best first.
+        
+        Uses argpartition-style selection (O(n)) and sorts only the
+        selected entries. Ties are broken by index, as a stable full
+        sort would.
+        
+        Args:
+            scores: 1-D array of scores
+            k: Number of indices to return (clipped to len(scores))
+            
+        Returns:
+            Array of at most k indices, sorted by score descending
+        """
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        
+        # k-th largest score; everything above it is in, ties at it are
+        # taken lowest index first
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - len(above)]
+        
+        selected = np.concatenate([above, ties])
+        selected.sort()
+        return selected[np.argsort(-scores[selected], kind='stable')]
+    
+    def precompute_top_k(self, k: int = 50, block_size: int = 1024) -> None:
+        """
+        Precompute the k most similar items (excluding self) for every item.
+        
+        Similarities are computed one block of rows at a time, so peak
+        memory stays at (block_size, n_items) instead of the full matrix.
+        Once computed, find_similar_items answers queries with
+        top_k <= k by slicing this table.
+        
+        Args:
+            k: Number of neighbours to keep per item
+            block_size: Number of rows scored per block
+        """
+        k = min(k, self.n_items - 1)
+        if k <= 0:
+            return
+        
+        logger.info(f"Precomputing top-{k} neighbours for {self.n_items} items...")
+        top_indices = np.empty((self.n_items, k), dtype=np.int32)
+        top_scores = np.empty((self.n_items, k), dtype=np.float32)
+        
+        for start in range(0, self.n_items, block_size):
+            stop = min(start + block_size, self.n_items)
+            block = linear_kernel(self._normed[start:stop], self._normed)
+            
+            # Exclude each item from its own neighbour list
+            rows = np.arange(stop - start)
+            block[rows, rows + start] = -np.inf
+            
+            # Select the k best per row, then sort just those k (ties keep
+            # index order, matching a full stable sort)
+            candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            candidates.sort(axis=1)
+            candidate_scores = np.take_along_axis(block, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1, kind='stable')
+            
+            top_indices[start:stop] = np.take_along_axis(candidates, order, axis=1)
+            top_scores[start:stop] = np.take_along_axis(candidate_scores, order, axis=1)
+        
+        self.top_k_indices = top_indices
+        self.top_k_scores = top_scores
+        logger.info(f"✓ Top-{k} table computed: {top_indices.shape}")
+    
+    def save_top_k(self, path: str) -> None:
+        """
+        Save the precomputed top-k table.
+        
+        Indices and scores are stored side by side in one raw .npy file
+        (a structured array), so load_top_k can memory-map it.
+        
+        Args:
+            path: Destination .npy file
+        """
+        if self.top_k_indices is None:
+            raise ValueError("No top-k table to save; call precompute_top_k first")
+        table = np.empty(
+            self.top_k_indices.shape,
+            dtype=[('idx', self.top_k_indices.dtype), ('score', self.top_k_scores.dtype)]
+        )
+        table['idx'] = self.top_k_indices
+        table['score'] = self.top_k_scores
+        
+        # Replace atomically: processes that mapped the old table keep it
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, table, allow_pickle=False)
+        os.replace(tmp_path, path)
+    
+    def load_top_k(
+        self,
+        path: str,
+        mmap_mode: Optional[str] = None,
+        k: Optional[int] = None
+    ) -> bool:
+        """
+        Load a previously saved top-k table.
+        
+        Args:
+            path: .npy file written by save_top_k
+            mmap_mode: Passed to np.load; 'r' maps the table read-only, so
+                processes loading the same file share one copy
+            k: If given, only accept a table that precompute_top_k(k)
+                would have produced (k neighbours, capped at n_items - 1)
+            
+        Returns:
+            True if the table was loaded, False if it is missing or its
+            shape does not match this engine's items (or k)
+        """
+        if not Path(path).exists():
+            return False
+        
+        table = np.load(path, mmap_mode=mmap_mode)
+        
+        if table.shape[0] != self.n_items:
+            logger.warning(f"Ignoring top-k table at {path}: built for a different item count")
+            return False
+        
+        if k is not None and table.shape[1] != min(k, self.n_items - 1):
+            logger.warning(f"Ignoring top-k table at {path}: built for a different k")
+            return False
+        
+        self.top_k_indices = table['idx']
+        self.top_k_scores = table['score']
+        return True
+    
     def compute_similarity_matrix(self) -> np.ndarray:
         """
         Pre-compute full similarity matrix.
         Useful for small datasets or when multiple queries are expected.
         
+        For catalogues of at most full_matrix_max_items the matrix is kept
+        (as cache_dtype) and returned again on later calls; treat it as
+        read-only.
+        
         Returns:
             Similarity matrix (n_items, n_items)
         """
+        if self._similarity_cache is not None:
+            return self._similarity_cache
+        
         logger.info("Computing full similarity matrix...")
-        similarity_matrix = cosine_similarity(self.feature_matrix)
+        # Rows are unit-length, so cosine is a single product X @ X.T
+        similarity_matrix = linear_kernel(self._normed)
         logger.info(f"✓ Similarity matrix computed: {similarity_matrix.shape}")
+        
+        if self.n_items <= self.full_matrix_max_items:
+            similarity_matrix = similarity_matrix.astype(self.cache_dtype, copy=False)
+            self._similarity_cache = similarity_matrix
         return similarity_matrix
     
     def find_similar_items(
@@ -66,44 +366,176 @@ class SimilarityEngine:
         if query_index < 0 or query_index >= self.n_items:
             raise ValueError(f"Query index {query_index} out of bounds [0, {self.n_items})")
         
-        # Get query vector
-        query_vector = self.feature_matrix[query_index].reshape(1, -1)
+        # Serve from the precomputed table when it covers the request
+        if (
+            exclude_self
+            and self.top_k_indices is not None
+            and top_k <= self.top_k_indices.shape[1]
+        ):
+            return list(zip(
+                self.top_k_indices[query_index, :top_k].tolist(),
+                self.top_k_scores[query_index, :top_k].tolist()
+            ))
+        
+        if self._index is not None:
+            return self._search_index(np.array([query_index]), top_k, exclude_self)[0]
+        
+        similarities = self.find_similar_scores(query_index)
+        # Rows of the cached full matrix are shared; fresh products are not
+        return self._rank_similar(
+            query_index, similarities, top_k, exclude_self,
+            writable=self._similarity_cache is None
+        )
+    
+    def find_similar_scores(self, query_index: int) -> np.ndarray:
+        """
+        Similarity of a query item to every item (brute force).
+        
+        Args:
+            query_index: Index of the query item
+            
+        Returns:
+            Array of n_items cosine similarities (treat as read-only: small
+            catalogues return a row of the cached full matrix)
+        """
+        if query_index < 0 or query_index >= self.n_items:
+            raise ValueError(f"Query index {query_index} out of bounds [0, {self.n_items})")
+        
+        if self.n_items <= self.full_matrix_max_items:
+            # Small catalogue: one row of the (lazily built) full matrix
+            return self.compute_similarity_matrix()[query_index]
         
-        # Compute similarities
-        similarities = cosine_similarity(query_vector, self.feature_matrix)[0]
+        if isinstance(self._normed, np.ndarray):
+            # Dense float32 rows: one BLAS matrix-vector product. The
+            # transposed view is Fortran-ordered, so trans=1 computes
+            # _normed @ query without copying the matrix.
+            return sgemv(1.0, self._normed.T, self._normed[query_index], trans=1)
         
-        # Create index-score pairs
-        scored_items = [(idx, score) for idx, score in enumerate(similarities)]
+        # Get query vector
+        query_vector = self._normed[query_index].reshape(1, -1)
+        
+        # Compute similarities (rows are unit-length, so this is cosine)
+        return linear_kernel(query_vector, self._normed)[0]
+    
+    def _rank_similar(
+        self,
+        query_index: int,
+        similarities: np.ndarray,
+        top_k: int,
+        exclude_self: bool,
+        writable: bool = False
+    ) -> List[Tuple[int, float]]:
+        """
+        Turn one query's similarity row into ranked (index, score) pairs.
         
-        # Exclude self if requested
+        Args:
+            query_index: Index of the query item
+            similarities: Similarity of the query to every item
+            top_k: Number of similar items to return
+            exclude_self: Whether to exclude the query item itself
+            writable: Whether similarities may be modified in place
+            
+        Returns:
+            List of (index, similarity_score) tuples, sorted by score descending
+        """
+        # Exclude self if requested: mask it out before selection (on a
+        # copy unless the row is ours to modify)
         if exclude_self:
-            scored_items = [(idx, score) for idx, score in scored_items if idx != query_index]
+            if not writable:
+                # Copy at float32 or wider (half-precision cached rows
+                # are slow to partition)
+                similarities = similarities.astype(np.promote_types(similarities.dtype, np.float32))
+            similarities[query_index] = -np.inf
+            top_k = min(top_k, len(similarities) - 1)
         
-        # Sort by score descending
-        scored_items.sort(key=lambda x: x[1], reverse=True)
+        # Select the best top_k without sorting every score
+        top = self.select_top_k(similarities, top_k)
         
-        # Return top-k
-        return scored_items[:top_k]
+        return list(zip(top.tolist(), similarities[top].tolist()))
     
     def batch_find_similar_items(
         self,
         query_indices: List[int],
-        top_k: int = 10
+        top_k: int = 10,
+        block_size: int = 1024
     ) -> List[List[Tuple[int, float]]]:
         """
         Find similar items for multiple queries efficiently.
         
+        Queries not covered by the precomputed table are scored together,
+        one (block_size, n_items) matrix product per block of queries,
+        instead of one product per query. Large batches are split into
+        shards scored on a thread pool (NumPy/BLAS release the GIL).
+        
         Args:
             query_indices: List of query item indices
             top_k: Number of similar items per query
+            block_size: Number of queries scored per block
+            
+        Returns:
+            List of results, one per query
+        """
+        rows = np.asarray(query_indices, dtype=np.intp).reshape(-1)
+        out_of_bounds = (rows < 0) | (rows >= self.n_items)
+        if out_of_bounds.any():
+            query_index = rows[out_of_bounds][0]
+            raise ValueError(f"Query index {query_index} out of bounds [0, {self.n_items})")
+        
+        # Table lookups are already cheap per query
+        if self.top_k_indices is not None and top_k <= self.top_k_indices.shape[1]:
+            return [self.find_similar_items(query_idx, top_k) for query_idx in rows.tolist()]
+        
+        if self._index is not None:
+            return self._search_index(rows, top_k, exclude_self=True)
+        
+        n_shards = max(1, min(
+            joblib.effective_n_jobs(self.n_jobs or -1),
+            len(rows) // _MIN_QUERIES_PER_SHARD
+        ))
+        if n_shards == 1:
+            return self._score_queries(rows, top_k, block_size)
+        
+        # Build the lazy full matrix once, not once per thread
+        if self.n_items <= self.full_matrix_max_items:
+            self.compute_similarity_matrix()
+        
+        bounds = np.linspace(0, len(rows), n_shards + 1, dtype=int)
+        shards = joblib.Parallel(n_jobs=n_shards, prefer='threads')(
+            joblib.delayed(self._score_queries)(rows[start:stop], top_k, block_size)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        )
+        return [result for shard in shards for result in shard]
+    
+    def _score_queries(
+        self,
+        rows: np.ndarray,
+        top_k: int,
+        block_size: int
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Score and rank query rows block by block (see batch_find_similar_items).
+        
+        Args:
+            rows: Query item indices
+            top_k: Number of similar items per query
+            block_size: Number of queries scored per block
             
         Returns:
             List of results, one per query
         """
         results = []
-        for query_idx in query_indices:
-            similar_items = self.find_similar_items(query_idx, top_k)
-            results.append(similar_items)
+        for start in range(0, len(rows), block_size):
+            block = rows[start:start + block_size]
+            if self.n_items <= self.full_matrix_max_items:
+                similarities = self.compute_similarity_matrix()[block]
+                similarities = similarities.astype(
+                    np.promote_types(similarities.dtype, np.float32), copy=False
+                )
+            else:
+                similarities = linear_kernel(self._normed[block], self._normed)
+            
+            for query_idx, row in zip(block.tolist(), similarities):
+                results.append(self._rank_similar(query_idx, row, top_k, exclude_self=True, writable=True))
         return results
     
     def get_similarity_score(self, index_a: int, index_b: int) -> float:
@@ -117,10 +549,20 @@ class SimilarityEngine:
         Returns:
             Similarity score between 0 and 1
         """
-        vector_a = self.feature_matrix[index_a].reshape(1, -1)
-        vector_b = self.feature_matrix[index_b].reshape(1, -1)
+        # Dot product of the normalized rows (norms were divided out once,
+        # in __init__)
+        normed = self._normed
+        if isinstance(normed, np.ndarray):
+            return float(np.dot(normed[index_a], normed[index_b]))
         
-        return cosine_similarity(vector_a, vector_b)[0, 0]
+        # Sparse rows: scatter row a into a dense vector (summing any
+        # duplicate entries), then gather it at row b's columns
+        row_a = slice(normed.indptr[index_a], normed.indptr[index_a + 1])
+        row_b = slice(normed.indptr[index_b], normed.indptr[index_b + 1])
+        dense_a = np.bincount(
+            normed.indices[row_a], weights=normed.data[row_a], minlength=normed.shape[1]
+        )
+        return float(np.dot(dense_a[normed.indices[row_b]], normed.data[row_b]))
 
 
 class HybridSimilarityEngine(SimilarityEngine):
@@ -131,7 +573,7 @@ class HybridSimilarityEngine(SimilarityEngine):
     
     def __init__(
         self,
-        feature_matrix: np.ndarray,
+        feature_matrix: Union[np.ndarray, spmatrix],
         feature_weights: dict = None
     ):
         """
@@ -143,6 +585,30 @@ class HybridSimilarityEngine(SimilarityEngine):
         """
         super().__init__(feature_matrix)
         self.feature_weights = feature_weights or {}
+        
+        # Row-normalized float32 column blocks, keyed by resolved slice
+        self._normed_blocks: dict = {}
+    
+    def _normed_block(self, features_slice: slice) -> Union[np.ndarray, spmatrix]:
+        """
+        Row-normalized copy of a block of feature columns (cached).
+        
+        Args:
+            features_slice: Slice of feature columns
+            
+        Returns:
+            float32 block whose non-zero rows are unit-length
+        """
+        key = features_slice.indices(self.feature_matrix.shape[1])
+        block = self._normed_blocks.get(key)
+        if block is None:
+            block = normalize(self.feature_matrix[:, features_slice], norm='l2')
+            if isinstance(block, np.ndarray):
+                block = np.ascontiguousarray(block, dtype=np.float32)
+            else:
+                block = block.astype(np.float32, copy=False).tocsr()
+            self._normed_blocks[key] = block
+        return block
     
     def compute_weighted_similarity(
         self,
@@ -165,16 +631,16 @@ class HybridSimilarityEngine(SimilarityEngine):
         Returns:
             Combined similarity scores
         """
-        # Extract feature subsets
-        text_features = self.feature_matrix[:, text_features_slice]
-        genre_features = self.feature_matrix[:, genre_features_slice]
+        # Extract feature subsets (normalized once, on first use)
+        text_features = self._normed_block(text_features_slice)
+        genre_features = self._normed_block(genre_features_slice)
         
-        # Compute separate similarities
+        # Compute separate similarities (unit rows, so dot = cosine)
         query_text = text_features[query_index].reshape(1, -1)
         query_genre = genre_features[query_index].reshape(1, -1)
         
-        text_sim = cosine_similarity(query_text, text_features)[0]
-        genre_sim = cosine_similarity(query_genre, genre_features)[0]
+        text_sim = linear_kernel(query_text, text_features)[0]
+        genre_sim = linear_kernel(query_genre, genre_features)[0]
         
         # Weighted combination
         combined_sim = (text_weight * text_sim) + (genre_weight * genre_sim)
@@ -0,0 +1,55 @@
+"""
+Shared test fixtures.
+
+The inputs are read-only, so they are built once per session instead of
+once per test.
+"""
+import pytest
+
+from models.movie import Movie
+from features.feature_builder import FeatureBuilder
+
+
+@pytest.fixture(scope="session")
+def sample_csv_text():
+    """CSV content of a small two-movie dataset."""
+    return """movie_id,title,genres,overview,language,rating
+1,Movie A,"Action, Drama",Overview A,en,8.5
+2,Movie B,Comedy,Overview B,en,7.2
+"""
+
+
+@pytest.fixture(scope="session")
+def sample_csv_path(tmp_path_factory, sample_csv_text):
+    """Create a temporary CSV file."""
+    csv_path = tmp_path_factory.mktemp("data") / "test_movies.csv"
+    csv_path.write_text(sample_csv_text)
+    return str(csv_path)
+
+
+@pytest.fixture(scope="session")
+def sample_movies():
+    """Create sample movies."""
+    return [
+        Movie(1, "Movie A", ["Action"], "Action packed movie", "en", 8.0),
+        Movie(2, "Movie B", ["Drama"], "Dramatic story", "en", 7.5),
+        Movie(3, "Movie C", ["Action", "Sci-Fi"], "Sci-fi action", "en", 8.5),
+    ]
+
+
+@pytest.fixture(scope="session")
+def fitted_builder(sample_movies):
+    """Fit one FeatureBuilder on sample_movies; returns (builder, features)."""
+    builder = FeatureBuilder(max_features=100)
+    features = builder.build_features(sample_movies)
+    return builder, features
+
+
+@pytest.fixture(scope="session")
+def preference_movies():
+    """Create movies with distinct genre mixes for preference tests."""
+    return [
+        Movie(1, "Action Movie", ["Action"], "Overview", "en", 8.0),
+        Movie(2, "Drama Movie", ["Drama"], "Overview", "en", 7.0),
+        Movie(3, "Action Drama", ["Action", "Drama"], "Overview", "en", 9.0),
+    ]
@@ -2,16 +2,16 @@
 Unit tests for the Movie Recommendation System
 Run with: pytest tests/
 """
+import io
 import pytest
 import numpy as np
-from pathlib import Path
-import sys
-
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import pandas as pd
+from scipy import sparse
 
+from main import MovieRecommender
 from models.movie import Movie
-from ingestion.loader import MovieDataLoader
+from ingestion.loader import MovieDataLoader, pq
+from ingestion.data_config import DataConfig
 from features.feature_builder import FeatureBuilder
 from similarity.similarity_engine import SimilarityEngine
 from preferences.preference_engine import PreferenceEngine, UserPreferences
@@ -20,110 +20,163 @@ from preferences.preference_engine import PreferenceEngine, UserPreferences
 class TestMovieModel:
     """Test the Movie data model."""
     
-    def test_movie_creation(self):
-        """Test basic movie creation."""
-        movie = Movie(
-            movie_id=1,
-            title="Test Movie",
-            genres=["Action", "Drama"],
-            overview="A test movie",
-            language="en",
-            rating=8.5
-        )
-        
-        assert movie.movie_id == 1
-        assert movie.title == "Test Movie"
-        assert len(movie.genres) == 2
-        assert movie.rating == 8.5
-    
-    def test_genre_parsing(self):
-        """Test genre string parsing."""
-        movie = Movie(
-            movie_id=1,
-            title="Test",
-            genres="Action, Drama, Sci-Fi",
-            overview="Test",
-            language="en",
-            rating=7.0
-        )
-        
-        assert len(movie.genres) == 3
-        assert "Action" in movie.genres
-    
-    def test_rating_validation(self):
-        """Test rating bounds."""
-        movie = Movie(
-            movie_id=1,
-            title="Test",
-            genres=["Drama"],
-            overview="Test",
-            language="en",
-            rating=15.0  # Invalid
-        )
-        
-        assert movie.rating == 0.0  # Should be normalized
+    BASE_FIELDS = dict(
+        movie_id=1,
+        title="Test Movie",
+        genres=["Action", "Drama"],
+        overview="A test movie",
+        language="en",
+        rating=8.5
+    )
+    
+    @pytest.mark.parametrize("overrides,expected", [
+        # Basic creation
+        ({}, {"movie_id": 1, "title": "Test Movie", "genres": ["Action", "Drama"], "rating": 8.5}),
+        # Genre string parsing
+        ({"genres": "Action, Drama, Sci-Fi"}, {"genres": ["Action", "Drama", "Sci-Fi"]}),
+        # Rating bounds: invalid ratings are normalized
+        ({"rating": 15.0}, {"rating": 0.0}),
+    ], ids=["creation", "genre_parsing", "rating_validation"])
+    def test_movie_fields(self, overrides, expected):
+        """Test Movie construction and field normalization."""
+        movie = Movie(**{**self.BASE_FIELDS, **overrides})
+        
+        for field_name, value in expected.items():
+            assert getattr(movie, field_name) == value
 
 
 class TestDataIngestion:
     """Test data loading and validation."""
     
-    @pytest.fixture
-    def sample_csv_path(self, tmp_path):
-        """Create a temporary CSV file."""
-        csv_path = tmp_path / "test_movies.csv"
-        csv_content = """movie_id,title,genres,overview,language,rating
-1,Movie A,"Action, Drama",Overview A,en,8.5
-2,Movie B,Comedy,Overview B,en,7.2
-"""
-        csv_path.write_text(csv_content)
-        return str(csv_path)
-    
-    def test_loader_basic(self, sample_csv_path):
+    def test_loader_basic(self, sample_csv_text):
         """Test basic data loading."""
-        loader = MovieDataLoader(sample_csv_path)
+        loader = MovieDataLoader.from_buffer(io.StringIO(sample_csv_text))
         movies = loader.load()
         
         assert len(movies) == 2
-        assert all(isinstance(m, Movie) for m in movies)
+        assert {type(m) for m in movies} == {Movie}
     
-    def test_schema_validation(self, tmp_path):
-        """Test schema validation with missing columns."""
-        csv_path = tmp_path / "invalid.csv"
-        csv_path.write_text("movie_id,title\n1,Movie A\n")
+    def test_load_table(self, sample_csv_path):
+        """Test column-oriented loading matches Movie objects."""
+        movies = MovieDataLoader(sample_csv_path).load()
+        table = MovieDataLoader(sample_csv_path).load_table()
         
-        loader = MovieDataLoader(str(csv_path))
+        assert len(table) == len(movies)
+        assert table.movie_id.tolist() == [m.movie_id for m in movies]
+        assert table.genres == [m.genres for m in movies]
+        assert table.rating.dtype == np.float32
+    
+    @pytest.mark.skipif(pq is None, reason="pyarrow not installed")
+    def test_parquet_cache(self, sample_csv_path, tmp_path):
+        """Test the Parquet cache reproduces the CSV load."""
+        cache_path = tmp_path / "movies.parquet"
+        movies = MovieDataLoader(sample_csv_path).load()
+        
+        first = MovieDataLoader(sample_csv_path, cache_path=str(cache_path)).load()
+        assert cache_path.exists()
+        cached = MovieDataLoader(sample_csv_path, cache_path=str(cache_path)).load()
+        
+        assert first == movies
+        assert cached == movies
+    
+    @pytest.mark.skipif(pq is None, reason="pyarrow not installed")
+    def test_parquet_source(self, sample_csv_path, tmp_path):
+        """Test that a Parquet data file loads like the CSV it came from."""
+        parquet_path = tmp_path / "movies.parquet"
+        pd.read_csv(sample_csv_path).to_parquet(parquet_path)
+        
+        movies = MovieDataLoader(sample_csv_path).load()
+        assert MovieDataLoader(str(parquet_path)).load() == movies
+        assert MovieDataLoader(str(parquet_path), chunksize=1).load() == movies
+    
+    def test_schema_validation(self):
+        """Test schema validation with missing columns."""
+        loader = MovieDataLoader.from_buffer(io.StringIO("movie_id,title\n1,Movie A\n"))
         
         with pytest.raises(ValueError, match="Missing required columns"):
             loader.load()
+    
+    def test_parse_genres_series(self):
+        """Test column-level genre parsing matches the per-value parser."""
+        config = DataConfig()
+        values = ['Action, Drama', '', ' , ', '[{"name": "Horror"}]', '[]', 'Sci-Fi,,Drama ']
+        parsed = config.parse_genres_series(pd.Series(values))
+        
+        assert parsed == [config.genre_parser(v) for v in values]
+        assert parsed[3] == ['Horror']
 
 
 class TestFeatureBuilder:
     """Test feature engineering."""
     
-    @pytest.fixture
-    def sample_movies(self):
-        """Create sample movies."""
-        return [
-            Movie(1, "Movie A", ["Action"], "Action packed movie", "en", 8.0),
-            Movie(2, "Movie B", ["Drama"], "Dramatic story", "en", 7.5),
-            Movie(3, "Movie C", ["Action", "Sci-Fi"], "Sci-fi action", "en", 8.5),
-        ]
-    
-    def test_feature_matrix_shape(self, sample_movies):
+    def test_feature_matrix_shape(self, sample_movies, fitted_builder):
         """Test feature matrix dimensions."""
-        builder = FeatureBuilder(max_features=100)
-        features = builder.build_features(sample_movies)
+        _, features = fitted_builder
         
         assert features.shape[0] == len(sample_movies)
         assert features.shape[1] > 0
+        assert sparse.isspmatrix_csr(features)
+        assert features.dtype == np.float32
+    
+    @pytest.mark.parametrize("use_idf", [True, False])
+    def test_hashing_features(self, sample_movies, use_idf):
+        """Test the vocabulary-free hashing text features."""
+        builder = FeatureBuilder(use_hashing=True, n_hash_features=2 ** 10, use_idf=use_idf)
+        features = builder.build_features(sample_movies)
+        
+        n_genres = len(builder.genre_encoder.classes_)
+        assert features.shape == (len(sample_movies), 2 ** 10 + n_genres + 1)
     
-    def test_index_mapping(self, sample_movies):
+    def test_build_from_table(self, sample_csv_path):
+        """Test that a MovieTable builds the same features as Movie objects."""
+        movies = MovieDataLoader(sample_csv_path).load()
+        table = MovieDataLoader(sample_csv_path).load_table()
+        ratings = table.rating.copy()
+        
+        expected = FeatureBuilder(max_features=100).build_features(movies)
+        features = FeatureBuilder(max_features=100).build_features(table)
+        
+        assert (features != expected).nnz == 0
+        assert np.array_equal(table.rating, ratings)
+    
+    def test_index_mapping(self, fitted_builder):
         """Test movie ID to index mapping."""
-        builder = FeatureBuilder()
-        builder.build_features(sample_movies)
+        builder, _ = fitted_builder
         
         assert builder.get_movie_index(1) == 0
         assert builder.get_movie_id(0) == 1
+        assert builder.get_movie_indices([3, 1, 42]).tolist() == [2, 0, -1]
+        
+        with pytest.raises(KeyError):
+            builder.get_movie_index(42)
+    
+    def test_save_load_roundtrip(self, fitted_builder, tmp_path):
+        """Test that the feature matrix is persisted with the builder."""
+        builder, features = fitted_builder
+        builder.save(str(tmp_path))
+        
+        restored = FeatureBuilder()
+        restored.load(str(tmp_path))
+        
+        assert restored.get_movie_index(3) == 2
+        assert (restored.feature_matrix != features).nnz == 0
+        
+        mapped = FeatureBuilder()
+        mapped.load(str(tmp_path), mmap_mode='r')
+        assert not mapped.feature_matrix.data.flags.writeable
+        assert (mapped.feature_matrix != features).nnz == 0
+    
+    def test_save_without_matrix(self, fitted_builder, tmp_path):
+        """Test that saving an unbuilt builder drops a previously saved matrix."""
+        builder, _ = fitted_builder
+        builder.save(str(tmp_path))
+        FeatureBuilder().save(str(tmp_path))
+        
+        restored = FeatureBuilder()
+        restored.load(str(tmp_path))
+        
+        assert restored.feature_matrix is None
+        assert not list(tmp_path.glob("features_*.npy"))
 
 
 class TestSimilarityEngine:
@@ -136,7 +189,7 @@ class TestSimilarityEngine:
             [1, 0, 0],
             [0.9, 0.1, 0],
             [0, 1, 0]
-        ])
+        ], dtype=np.float32, order="C")
         
         engine = SimilarityEngine(features)
         similar = engine.find_similar_items(0, top_k=2)
@@ -144,22 +197,52 @@ class TestSimilarityEngine:
         assert len(similar) == 2
         # Most similar to [1,0,0] should be [0.9,0.1,0]
         assert similar[0][0] == 1
+    
+    @pytest.mark.parametrize("fmt", ["csr", "csc", "coo"])
+    def test_similarity_score_sparse_formats(self, fmt):
+        """Test pairwise scores for unit-norm sparse input in any format."""
+        rng = np.random.default_rng(0)
+        dense = rng.random((6, 4)).astype(np.float32)
+        dense /= np.linalg.norm(dense, axis=1, keepdims=True)
+        
+        engine = SimilarityEngine(sparse.csr_matrix(dense).asformat(fmt))
+        
+        assert np.isclose(engine.get_similarity_score(0, 3), dense[0] @ dense[3])
+    
+    def test_precomputed_top_k(self):
+        """Test that the top-k table matches brute-force search."""
+        rng = np.random.default_rng(0)
+        features = rng.random((20, 5))
+        
+        engine = SimilarityEngine(features)
+        expected = [engine.find_similar_items(i, top_k=3) for i in range(20)]
+        
+        engine.precompute_top_k(k=5, block_size=7)
+        for i in range(20):
+            table = engine.find_similar_items(i, top_k=3)
+            assert [idx for idx, _ in table] == [idx for idx, _ in expected[i]]
+            assert np.allclose([s for _, s in table], [s for _, s in expected[i]])
+    
+    def test_top_k_roundtrip(self, tmp_path):
+        """Test that a saved top-k table is only reused for the same k."""
+        rng = np.random.default_rng(0)
+        engine = SimilarityEngine(rng.random((20, 5)))
+        engine.precompute_top_k(k=5)
+        engine.save_top_k(str(tmp_path / "topk.npy"))
+        
+        restored = SimilarityEngine(rng.random((20, 5)))
+        assert not restored.load_top_k(str(tmp_path / "topk.npy"), k=8)
+        assert restored.top_k_indices is None
+        assert restored.load_top_k(str(tmp_path / "topk.npy"), k=5)
+        assert np.array_equal(restored.top_k_indices, engine.top_k_indices)
 
 
 class TestPreferenceEngine:
     """Test preference application."""
     
-    @pytest.fixture
-    def sample_movies(self):
-        return [
-            Movie(1, "Action Movie", ["Action"], "Overview", "en", 8.0),
-            Movie(2, "Drama Movie", ["Drama"], "Overview", "en", 7.0),
-            Movie(3, "Action Drama", ["Action", "Drama"], "Overview", "en", 9.0),
-        ]
-    
-    def test_genre_boost(self, sample_movies):
+    def test_genre_boost(self, preference_movies):
         """Test genre preference boost."""
-        engine = PreferenceEngine(sample_movies)
+        engine = PreferenceEngine(preference_movies)
         prefs = UserPreferences(preferred_genres=["Action"])
         
         candidates = [(1, 1.0), (2, 1.0), (3, 1.0)]
@@ -170,24 +253,40 @@ class TestPreferenceEngine:
         drama_scores = [s for mid, s in results if mid == 2]
         
         assert all(a > d for a in action_scores for d in drama_scores)
+    
+    def test_neutral_preferences(self, preference_movies):
+        """Test that empty preferences only re-sort the candidates."""
+        engine = PreferenceEngine(preference_movies)
+        prefs = UserPreferences()
+        assert prefs.is_neutral()
+        
+        candidates = [(1, 0.4), (2, 0.8), (3, 0.4)]
+        results = engine.apply_preferences(candidates, prefs, normalize=False)
+        
+        assert results == [(2, 0.8), (1, 0.4), (3, 0.4)]
+    
+    def test_empty_catalogue(self):
+        """Test that an engine over no movies re-ranks nothing."""
+        engine = PreferenceEngine([])
+        prefs = UserPreferences(preferred_genres=["Action"], min_rating=5.0)
+        
+        assert engine.apply_preferences([], prefs) == []
 
 
 class TestEndToEnd:
     """End-to-end integration tests."""
     
-    def test_full_pipeline(self, tmp_path):
+    def test_full_pipeline(self):
         """Test complete recommendation pipeline."""
         # Create test data
-        csv_path = tmp_path / "movies.csv"
         csv_content = """movie_id,title,genres,overview,language,rating
 1,Matrix,"Action, Sci-Fi",Sci-fi action movie,en,8.7
 2,Inception,"Action, Sci-Fi",Dream heist movie,en,8.8
 3,Notebook,Romance,Romantic drama,en,7.8
 """
-        csv_path.write_text(csv_content)
         
         # Load data
-        loader = MovieDataLoader(str(csv_path))
+        loader = MovieDataLoader.from_buffer(io.StringIO(csv_content))
         movies = loader.load()
         
         # Build features
@@ -201,6 +300,23 @@ class TestEndToEnd:
         # Should find Inception as most similar to Matrix
         candidates = [(builder.get_movie_id(idx), score) for idx, score in similar]
         assert candidates[0][0] == 2  # Inception
+    
+    def test_feature_cache_invalidation(self, sample_csv_text, tmp_path):
+        """Test that editing the data file rebuilds the cached features."""
+        csv_path = tmp_path / "movies.csv"
+        csv_path.write_text(sample_csv_text)
+        cache_dir = str(tmp_path / "cache")
+        
+        MovieRecommender(str(csv_path), cache_dir=cache_dir)
+        cached = MovieRecommender(str(csv_path), cache_dir=cache_dir)
+        # A reused matrix is memory-mapped from the cache
+        assert not cached.feature_builder.feature_matrix.data.flags.writeable
+        
+        csv_path.write_text(sample_csv_text.replace("Overview B", "Spaceship overview B"))
+        rebuilt = MovieRecommender(str(csv_path), cache_dir=cache_dir)
+        
+        assert rebuilt.feature_builder.feature_matrix.data.flags.writeable
+        assert "spaceship" in rebuilt.feature_builder.tfidf_vectorizer.vocabulary_
 
 
 if __name__ == "__main__":